@@ -0,0 +1,50 @@
+import json
+import logging
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+
+from db.functions import get_fsm_record, save_fsm_state, save_fsm_data, purge_fsm, get_fsm_stats
+from utils.config import fsm_state_ttl
+
+
+# FSM aiogram у базі (таблиця FsmStates): стан переживає перезапуск, а пам'ять бота не росте
+# з кількістю незавершених сценаріїв. Стан без змін довше за ttl вважається покинутим:
+# читається як порожній і видаляється purge_expired (планувальник у bot.main).
+# Читання йдуть через db.row_cache.fsm_cache, тож FSMContextMiddleware не ходить у базу на кожне оновлення.
+class DbStorage(BaseStorage):
+    def __init__(self, ttl: float = fsm_state_ttl):
+        self.ttl = ttl
+
+    async def set_state(self, key: StorageKey, state=None) -> None:
+        await save_fsm_state(self._key(key), state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        record = await get_fsm_record(self._key(key), self.ttl)
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: dict) -> None:
+        await save_fsm_data(self._key(key), json.dumps(data, ensure_ascii=False) if data else None)
+
+    async def get_data(self, key: StorageKey) -> dict:
+        record = await get_fsm_record(self._key(key), self.ttl)
+        return json.loads(record.data) if record and record.data else {}
+
+    async def purge_expired(self) -> int:
+        purged = await purge_fsm(self.ttl)
+        if purged:
+            logging.info(f"Purged {purged} abandoned FSM states")
+        return purged
+
+    async def stats(self) -> dict:
+        return await get_fsm_stats(self.ttl)
+
+    async def close(self) -> None:
+        pass
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.destiny}"
+
+
+fsm_storage = DbStorage()
@@ -1,34 +1,92 @@
 import asyncio
+import datetime
 import logging
 import sys
 import os
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-import pytz
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.config import *
 from bot.bot_instance import bot
-from utils.handlers import router, daily_notification
+from bot.middlewares import DbSessionMiddleware, RequestContextMiddleware
+from bot.fsm_storage import fsm_storage
+from bot.send_queue import send_queue, SendQueueMiddleware
+from db.migrations import pending_migrations
+from db.models import get_engine, get_async_engine
+from db.session import warm_up_engine
+from utils.client_pool import client_pool
+from utils.executor import blocking_executor
+from utils.rate_limiter import rate_limiter
+from utils.token_vault import token_vault
+from utils.handlers import router
+from utils.digest_schedule import scheduler, start_scheduler, sync_digest_jobs
+from utils.due_today import precompute_due_today
 from aiogram import Dispatcher
 
 
+def log_rate_limits():
+    rate_limiter.evict_idle()
+    for token_key, stats in rate_limiter.stats().items():
+        logging.info(f"Asana rate limit {token_key}: {stats}")
+
+
+def log_send_queue():
+    logging.info(f"Telegram send queue: {send_queue.stats()}")
+
+
+async def log_fsm_storage():
+    logging.info(f"FSM storage: {await fsm_storage.stats()}")
+
+
+def log_token_vault():
+    logging.info(f"Token vault: {token_vault.stats()}")
+
+
 async def main():
-    dp = Dispatcher()
+    try:
+        token_vault.require_key()
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+
+    # Схема оновлюється окремим кроком (release у Procfile або python -m db.migrate)
+    pending = pending_migrations(get_engine())
+    if pending:
+        raise SystemExit(f"Database schema is behind by {len(pending)} migration(s): run python -m db.migrate")
+
+    dp = Dispatcher(storage=fsm_storage)
+    dp.update.outer_middleware(DbSessionMiddleware())
+    dp.update.outer_middleware(RequestContextMiddleware())
     dp.include_router(router)
 
-    # Створення планувальника
-    scheduler = AsyncIOScheduler()
+    # Службові задачі
+    scheduler.add_job(client_pool.evict_idle, 'interval', minutes=5)
+    scheduler.add_job(log_rate_limits, 'interval', minutes=5)
+    scheduler.add_job(log_send_queue, 'interval', minutes=5)
+    scheduler.add_job(log_fsm_storage, 'interval', minutes=5)
+    scheduler.add_job(log_token_vault, 'interval', minutes=5)
+    scheduler.add_job(fsm_storage.purge_expired, 'interval', seconds=fsm_purge_interval)
+    # Задачі на сьогодні перераховуються заздалегідь, перший раз - одразу після старту
+    scheduler.add_job(precompute_due_today, 'interval', seconds=due_today_interval,
+                      next_run_time=datetime.datetime.now(), max_instances=1, coalesce=True)
 
-    # Налаштування часової зони
-    kiev = pytz.timezone('Europe/Kiev')
+    # Перше підключення до бази - до того, як оновлення і задачі почнуть відкривати сесії одночасно
+    await warm_up_engine()
 
-    # Додавання завдання
-    scheduler.add_job(daily_notification, 'cron', hour=9, minute=0, timezone=kiev)
+    # Запуск планувальника; розклад нагадувань завантажується з бази і звіряється з налаштуваннями чатів
+    start_scheduler()
+    await sync_digest_jobs()
 
-    # Запуск планувальника
-    scheduler.start()
+    # Усі повідомлення чатам йдуть через чергу з лімітами Telegram
+    bot.session.middleware(SendQueueMiddleware(send_queue))
+    send_queue.start()
 
     # Запуск бота
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        scheduler.shutdown(wait=False)
+        await send_queue.close()
+        await client_pool.close()
+        blocking_executor.shutdown(wait=False)
+        await get_async_engine().dispose()
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.DEBUG)
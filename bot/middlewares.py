@@ -0,0 +1,26 @@
+from aiogram import BaseMiddleware
+
+from db.functions import get_user, get_default_settings
+from db.session import session_scope
+from utils.asana_functions import asana_client_for
+
+
+# Окрема сесія бази даних на кожне оновлення Telegram
+class DbSessionMiddleware(BaseMiddleware):
+    async def __call__(self, handler, event, data):
+        async with session_scope():
+            return await handler(event, data)
+
+
+# Користувач, налаштування чату і клієнт Asana один раз на оновлення; хендлери отримують їх
+# аргументами user, settings, asana_client (None, якщо користувач не зареєстрований чи чат не налаштований).
+# Рядки читаються через кеш db.row_cache, тож зазвичай оновлення не робить жодного запиту до бази.
+class RequestContextMiddleware(BaseMiddleware):
+    async def __call__(self, handler, event, data):
+        from_user = data.get('event_from_user')
+        chat = data.get('event_chat')
+        user = await get_user(from_user.id) if from_user else None
+        data['user'] = user
+        data['settings'] = await get_default_settings(chat.id) if chat else None
+        data['asana_client'] = asana_client_for(user)
+        return await handler(event, data)
@@ -0,0 +1,194 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+from utils.config import telegram_global_rate, telegram_chat_rate, telegram_group_rate_per_minute, \
+    telegram_chat_burst, telegram_send_workers, telegram_max_retries
+from utils.rate_limiter import TokenBucket
+from utils.ttl_cache import TTLCache
+
+INTERACTIVE = 0
+BULK = 1
+
+# Пріоритет повідомлень поточної задачі; розсилки виставляють BULK, відповіді користувачам лишаються INTERACTIVE
+send_priority = contextvars.ContextVar('send_priority', default=INTERACTIVE)
+
+
+class _Outgoing:
+    def __init__(self, chat_id, send, future: asyncio.Future, priority: int):
+        self.chat_id = chat_id
+        self.send = send
+        self.future = future
+        self.priority = priority
+        self.queued_at = time.monotonic()
+        self.attempts = 0
+
+
+# Черга вихідних повідомлень Telegram: спільний token bucket на бота (~30 повідомлень/с)
+# і окремі bucket на кожен чат (1/с в особистих, 20/хв у групах).
+# Повідомлення чекають у черзі свого чату; воркер бере лише чат, bucket якого вже має токен,
+# тож загальмований груповий чат не займає воркерів. Чати, що ще не готові, відкладаються до часу готовності.
+# Інтерактивні відповіді обганяють масові розсилки, TelegramRetryAfter повертає повідомлення в чергу.
+class TelegramSendQueue:
+    def __init__(self, global_rate: float = telegram_global_rate, chat_rate: float = telegram_chat_rate,
+                 group_rate_per_minute: float = telegram_group_rate_per_minute, chat_burst: float = telegram_chat_burst,
+                 workers: int = telegram_send_workers, max_retries: int = telegram_max_retries):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate_per_minute / 60
+        self.chat_burst = chat_burst
+        self.workers = workers
+        self.max_retries = max_retries
+        self._chats = TTLCache(maxsize=10000, ttl=10 * 60)
+        # Черга повідомлень кожного чату: купа (priority, seq, item)
+        self._chat_queues: dict = {}
+        # Чати, що вже заплановані: в черзі готових, відкладені таймером або зараз відправляються
+        self._active: set = set()
+        self._timers: dict = {}
+        self._ready: asyncio.PriorityQueue | None = None
+        self._workers: list[asyncio.Task] = []
+        self._seq = itertools.count()
+        self._pending = {INTERACTIVE: 0, BULK: 0}
+        self._latencies = deque(maxlen=1000)
+        self.sent = 0
+        self.retries = 0
+        self.failures = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self):
+        self._ready = asyncio.PriorityQueue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+
+    async def submit(self, chat_id, send, priority: int | None = None):
+        if not self.running:
+            return await send()
+        priority = send_priority.get() if priority is None else priority
+        item = _Outgoing(chat_id, send, asyncio.get_running_loop().create_future(), priority)
+        self._pending[priority] += 1
+        heapq.heappush(self._chat_queues.setdefault(chat_id, []), (priority, next(self._seq), item))
+        if chat_id not in self._active:
+            self._schedule(chat_id)
+        try:
+            return await item.future
+        finally:
+            self._pending[priority] -= 1
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+        return {
+            'interactive_queued': self._pending[INTERACTIVE],
+            'bulk_queued': self._pending[BULK],
+            'sent': self.sent,
+            'retries': self.retries,
+            'failures': self.failures,
+            'latency_avg': round(sum(latencies) / len(latencies), 3) if latencies else 0,
+            'latency_p95': round(latencies[int(len(latencies) * 0.95)], 3) if latencies else 0,
+            'latency_max': round(latencies[-1], 3) if latencies else 0,
+        }
+
+    def _schedule(self, chat_id):
+        self._timers.pop(chat_id, None)
+        queue = self._chat_queues.get(chat_id)
+        if not queue:
+            self._chat_queues.pop(chat_id, None)
+            self._active.discard(chat_id)
+            return
+        self._active.add(chat_id)
+        wait = self._chat_bucket(chat_id).ready_in()
+        if wait > 0:
+            # Чат ще не може отримати повідомлення - повертаємось до нього, коли з'явиться токен
+            self._timers[chat_id] = asyncio.get_running_loop().call_later(wait, self._schedule, chat_id)
+            return
+        priority, seq, _ = queue[0]
+        self._ready.put_nowait((priority, seq, chat_id))
+
+    async def _worker(self):
+        while True:
+            _, _, chat_id = await self._ready.get()
+            try:
+                await self._deliver(chat_id)
+            except Exception as e:
+                logging.error(f"Telegram send queue worker failed: {e}")
+            finally:
+                self._ready.task_done()
+                self._schedule(chat_id)
+
+    async def _deliver(self, chat_id):
+        queue = self._chat_queues.get(chat_id)
+        if not queue:
+            return
+        priority, seq, item = heapq.heappop(queue)
+        # Відправник вже не чекає (скасований хендлер) - не витрачаємо ліміт
+        if item.future.done():
+            return
+        chat_bucket = self._chat_bucket(chat_id)
+        if not chat_bucket.try_acquire():
+            heapq.heappush(queue, (priority, seq, item))
+            return
+        await self.global_bucket.acquire()
+        try:
+            result = await item.send()
+        except TelegramRetryAfter as e:
+            if item.attempts < self.max_retries:
+                item.attempts += 1
+                self.retries += 1
+                chat_bucket.pause(e.retry_after)
+                # Повертаємо на своє місце в черзі чату, порядок повідомлень у чаті зберігається
+                heapq.heappush(queue, (priority, seq, item))
+                return
+            self._fail(item, e)
+            return
+        except Exception as e:
+            self._fail(item, e)
+            return
+        self.sent += 1
+        self._latencies.append(time.monotonic() - item.queued_at)
+        if not item.future.done():
+            item.future.set_result(result)
+
+    def _fail(self, item: _Outgoing, error: Exception):
+        self.failures += 1
+        if not item.future.done():
+            item.future.set_exception(error)
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            is_group = isinstance(chat_id, int) and chat_id < 0
+            bucket = TokenBucket(self.group_rate if is_group else self.chat_rate, self.chat_burst)
+            self._chats.set(chat_id, bucket)
+        return bucket
+
+
+# Пропускає через чергу всі методи бота, адресовані чату (send_message, send_sticker, ...)
+class SendQueueMiddleware(BaseRequestMiddleware):
+    def __init__(self, queue: TelegramSendQueue):
+        self.queue = queue
+
+    async def __call__(self, make_request, bot, method):
+        chat_id = getattr(method, 'chat_id', None)
+        if chat_id is None:
+            return await make_request(bot, method)
+        return await self.queue.submit(chat_id, lambda: make_request(bot, method))
+
+
+send_queue = TelegramSendQueue()
@@ -1,132 +1,289 @@
 # from typing import Any
+import datetime
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from .models import Users, DefaultSettings, DueTodayTask, DueTodayProject, JobRun, FsmState, \
+    get_async_engine
+from .row_cache import users_cache, settings_cache, fsm_cache
+from .session import use_session
+from .user_index import user_index
+
+# Рядків в одному INSERT (SQLite обмежує кількість параметрів запиту)
+upsert_chunk_size = 500
+
+
+async def create_user(tg_id: int, tg_first_name: str, tg_username: str, asana_token: str | None,
+                      asana_refresh_token: str | None,
+                      asana_id: str):
+    # Існуючому користувачу оновлюються лише токени та asana_id
+    await upsert_users([dict(tg_id=tg_id, tg_first_name=tg_first_name, tg_username=tg_username,
+                             asana_token=asana_token, asana_refresh_token=asana_refresh_token, asana_id=asana_id)])
+
+
+# Пакетний варіант create_user: один INSERT ... ON CONFLICT DO UPDATE на кожні upsert_chunk_size рядків
+async def upsert_users(rows: list[dict]):
+    await _upsert(Users, rows, ['asana_token', 'asana_refresh_token', 'asana_id'])
+    for row in rows:
+        users_cache.invalidate(row['tg_id'])
+        user_index.put(row['tg_id'], row['asana_id'])
 
-from sqlalchemy import and_
-from .models import Users, DefaultSettings, session
-
-
-def create_user(tg_id: int, tg_first_name: str, tg_username: str, asana_token: str | None,
-                asana_refresh_token: str | None,
-                asana_id: str):
-    user = session.query(Users).filter(Users.tg_id == tg_id).first()
-    if user:
-        # Оновлення існуючого користувача
-        user.asana_token = asana_token
-        user.asana_refresh_token = asana_refresh_token
-        user.asana_id = asana_id
-    else:
-        # Створення нового користувача
-        user = Users(tg_id=tg_id, tg_first_name=tg_first_name, tg_username=tg_username, asana_token=asana_token,
-                     asana_refresh_token=asana_refresh_token, asana_id=asana_id)
-        session.add(user)
-    session.commit()
-
-
-def get_user(tg_id: int) -> Users | None:
-    user = session.query(Users).filter(Users.tg_id == tg_id).first()
-    if not user:
-        return None
-    return user
 
+# fresh=True читає рядок з бази в обхід кешу (оновлення токена порівнює токени з останнім записом)
+async def get_user(tg_id: int, fresh: bool = False) -> Users | None:
+    if fresh:
+        return await _load_row(Users, tg_id)
+    return await users_cache.get(tg_id, lambda: _load_row(Users, tg_id))
 
-def get_all_user_ids():
-    users = session.query(Users).all()
-    user_ids = [user.tg_id for user in users]
-    return user_ids
 
+async def get_asana_id_by_username(username: str) -> str | None:
+    return (await get_asana_ids_by_usernames([username]))[username]
 
-def get_asana_id_by_tg_id(tg_id: int) -> str:
-    user = session.query(Users).filter(Users.tg_id == tg_id).first()
-    return user.asana_id
 
+# Asana id для кількох username одним запитом (індекс за lower(tg_username)); невідомі - None
+async def get_asana_ids_by_usernames(usernames: list[str]) -> dict[str, str | None]:
+    lowered = {username.lower() for username in usernames}
+    if not lowered:
+        return {}
+    query = select(func.lower(Users.tg_username), Users.asana_id).where(func.lower(Users.tg_username).in_(lowered))
+    async with use_session() as session:
+        found = dict((await session.execute(query)).all())
+    return {username: found.get(username.lower()) for username in usernames}
 
-def get_asana_id_by_username(username: str) -> str:
-    user = session.query(Users).filter(Users.tg_username == username).first()
-    return user.asana_id
 
+async def toggle_notify_empty(tg_id: int) -> bool | None:
+    async with use_session() as session:
+        user = await session.get(Users, tg_id)
+        if not user:
+            return None
+        user.notify_empty = not user.notify_empty
+        await session.commit()
+    users_cache.invalidate(tg_id)
+    user_index.set_notify_empty(tg_id, user.notify_empty)
+    return user.notify_empty
 
-def delete_user(tg_id: int):
-    session.query(Users).filter(Users.tg_id == tg_id).delete()
-    session.commit()
+
+async def delete_user(tg_id: int):
+    async with use_session() as session:
+        await session.execute(delete(Users).where(Users.tg_id == tg_id))
+        await session.commit()
+    users_cache.invalidate(tg_id)
+    user_index.remove(tg_id)
     return True
 
 
-def create_default_settings_private(chat_id: int, workspace_id: str, workspace_name: str, notification_user_id: int,
-                                    stickers: bool = True):
-    settings = session.query(DefaultSettings).filter(DefaultSettings.chat_id == chat_id).first()
-
-    if settings:
-        # Якщо запис існує, оновлюємо його значення
-        settings.chat_id = chat_id
-        settings.workspace_id = workspace_id
-        settings.workspace_name = workspace_name
-        settings.notification_user_id = notification_user_id
-        settings.toggle_stickers = stickers
-    else:
-        # Якщо запис не існує, створюємо новий запис
-        settings = DefaultSettings(
-            chat_id=chat_id,
-            workspace_id=workspace_id,
-            workspace_name=workspace_name,
-            notification_user_id=notification_user_id,
-            toggle_stickers=stickers
-        )
-
-    session.add(settings)
-    session.commit()
+async def create_default_settings_private(chat_id: int, workspace_id: str, workspace_name: str,
+                                          notification_user_id: int, stickers: bool = True):
+    await upsert_default_settings([dict(chat_id=chat_id, workspace_id=workspace_id, workspace_name=workspace_name,
+                                        notification_user_id=notification_user_id, toggle_stickers=stickers)])
     return True
 
 
-def create_default_settings(chat_id: int, workspace_id: str, workspace_name: str, project_id: str,
-                            project_name: str, section_id: str, section_name: str, user_id: int, stickers: bool = True):
-    settings = session.query(DefaultSettings).filter(DefaultSettings.chat_id == chat_id).first()
-
-    if settings:
-        # Якщо запис існує, оновлюємо його значення
-        settings.workspace_id = workspace_id
-        settings.workspace_name = workspace_name
-        settings.project_id = project_id
-        settings.project_name = project_name
-        settings.section_id = section_id
-        settings.section_name = section_name
-        settings.notification_user_id = user_id
-        settings.toggle_stickers = stickers
-    else:
-        # Якщо запис не існує, створюємо новий запис
-        settings = DefaultSettings(
-            chat_id=chat_id,
-            workspace_id=workspace_id,
-            workspace_name=workspace_name,
-            project_id=project_id,
-            project_name=project_name,
-            section_id=section_id,
-            section_name=section_name,
-            notification_user_id=user_id,
-            toggle_stickers=stickers
-        )
-
-    session.add(settings)
-    session.commit()
+async def create_default_settings(chat_id: int, workspace_id: str, workspace_name: str, project_id: str,
+                                  project_name: str, section_id: str, section_name: str, user_id: int,
+                                  stickers: bool = True):
+    await upsert_default_settings([dict(chat_id=chat_id, workspace_id=workspace_id, workspace_name=workspace_name,
+                                        project_id=project_id, project_name=project_name, section_id=section_id,
+                                        section_name=section_name, notification_user_id=user_id,
+                                        toggle_stickers=stickers)])
     return True
 
 
-def get_default_settings_for_notification() -> DefaultSettings:
-    settings = session.query(DefaultSettings).filter(
-        and_(DefaultSettings.notification_user_id != None, DefaultSettings.chat_id < 0)).all()
-    return settings
+# Пакетний запис налаштувань чатів; оновлюються лише колонки, передані в рядках
+# (час і часовий пояс нагадування існуючого чату зберігаються)
+async def upsert_default_settings(rows: list[dict]):
+    await _upsert(DefaultSettings, rows, [column for column in rows[0] if column != 'chat_id'] if rows else [])
+    for row in rows:
+        settings_cache.invalidate(row['chat_id'])
+
+
+async def get_default_settings_for_notification(digest_time: str | None = None,
+                                                timezone: str | None = None) -> list[DefaultSettings]:
+    query = select(DefaultSettings).where(
+        and_(DefaultSettings.notification_user_id != None, DefaultSettings.chat_id < 0))
+    if digest_time is not None:
+        query = query.where(DefaultSettings.digest_time == digest_time, DefaultSettings.timezone == timezone)
+    async with use_session() as session:
+        return list(await session.scalars(query))
 
 
-def get_default_settings(chat_id: int) -> DefaultSettings:
-    settings = session.query(DefaultSettings).filter(DefaultSettings.chat_id == chat_id).first()
-    return settings
+async def get_digest_slots() -> set[tuple[str, str]]:
+    query = select(DefaultSettings.digest_time, DefaultSettings.timezone).where(
+        and_(DefaultSettings.notification_user_id != None, DefaultSettings.chat_id < 0)).distinct()
+    async with use_session() as session:
+        rows = await session.execute(query)
+    return {(digest_time, timezone) for digest_time, timezone in rows}
+
+
+async def set_digest_time(chat_id: int, digest_time: str, timezone: str) -> bool:
+    async with use_session() as session:
+        settings = await session.get(DefaultSettings, chat_id)
+        if not settings:
+            return False
+        settings.digest_time = digest_time
+        settings.timezone = timezone
+        await session.commit()
+    settings_cache.invalidate(chat_id)
+    return True
 
 
-def toggle_stickers(chat_id: int):
-    chat_settings = get_default_settings(chat_id)
-    if chat_settings:
+async def get_default_settings(chat_id: int) -> DefaultSettings:
+    return await settings_cache.get(chat_id, lambda: _load_row(DefaultSettings, chat_id))
+
+
+async def toggle_stickers(chat_id: int) -> bool | None:
+    async with use_session() as session:
+        chat_settings = await session.get(DefaultSettings, chat_id)
+        if not chat_settings:
+            return None
         chat_settings.toggle_stickers = not chat_settings.toggle_stickers
-        session.commit()
+        await session.commit()
+    settings_cache.invalidate(chat_id)
+    return chat_settings.toggle_stickers
+
+
+async def delete_settings(chat_id: int):
+    async with use_session() as session:
+        await session.execute(delete(DefaultSettings).where(DefaultSettings.chat_id == chat_id))
+        await session.commit()
+    settings_cache.invalidate(chat_id)
+
+
+async def replace_due_today_tasks(project_id: str, dates: list[str], tasks: list[dict]):
+    async with use_session() as session:
+        await session.execute(delete(DueTodayTask).where(DueTodayTask.project_id == project_id,
+                                                         DueTodayTask.due_on.in_(dates)))
+        session.add_all([DueTodayTask(project_id=project_id, due_on=task['due_on'], task_gid=task['gid'],
+                                      task_name=task['name'], assignee_gid=task['assignee_gid'])
+                         for task in tasks if task['due_on'] in dates])
+        project = await session.get(DueTodayProject, project_id)
+        if project is None:
+            project = DueTodayProject(project_id=project_id)
+            session.add(project)
+        project.computed_at = datetime.datetime.utcnow()
+        await session.commit()
+
+
+async def get_due_today_tasks(project_id: str, due_on: str, max_age: float) -> list[DueTodayTask] | None:
+    async with use_session() as session:
+        project = await session.get(DueTodayProject, project_id, populate_existing=True)
+        if project is None or project.computed_at is None or \
+                project.computed_at < datetime.datetime.utcnow() - datetime.timedelta(seconds=max_age):
+            return None
+        return list(await session.scalars(select(DueTodayTask).where(DueTodayTask.project_id == project_id,
+                                                                     DueTodayTask.due_on == due_on)))
+
+
+async def invalidate_due_today(project_id: str):
+    async with use_session() as session:
+        project = await session.get(DueTodayProject, project_id)
+        if project is not None:
+            project.computed_at = None
+            await session.commit()
+
+
+async def delete_due_today_task(task_gid: str):
+    async with use_session() as session:
+        await session.execute(delete(DueTodayTask).where(DueTodayTask.task_gid == task_gid))
+        await session.commit()
+
+
+async def purge_due_today(before: str):
+    async with use_session() as session:
+        await session.execute(delete(DueTodayTask).where(DueTodayTask.due_on < before))
+        await session.commit()
+
+
+async def save_job_run(report: dict):
+    async with use_session() as session:
+        session.add(JobRun(**report))
+        await session.commit()
+
+
+async def get_job_runs(limit: int = 10) -> list[JobRun]:
+    async with use_session() as session:
+        return list(await session.scalars(select(JobRun).order_by(JobRun.started_at.desc()).limit(limit)))
+
+
+
+# Прострочений запис видаляється при читанні, щоб новий сценарій не підхопив дані покинутого
+# Через кеш: для ключа без стану (звичайні повідомлення в чатах) запиту до бази немає
+async def get_fsm_record(key: str, max_age: float) -> FsmState | None:
+    record = await fsm_cache.get(key, lambda: _load_row(FsmState, key))
+    if record is None:
+        return None
+    before = datetime.datetime.utcnow() - datetime.timedelta(seconds=max_age)
+    if record.updated_at < before:
+        async with use_session() as session:
+            await session.execute(delete(FsmState).where(FsmState.key == key, FsmState.updated_at < before))
+            await session.commit()
+        fsm_cache.invalidate(key)
+        return None
+    return record
+
+
+# Порожній стан без даних не зберігається: FSMContext.clear() видаляє рядок
+async def save_fsm_state(key: str, state: str | None):
+    await _save_fsm(key, 'state', state, FsmState.data)
+
+
+async def save_fsm_data(key: str, data: str | None):
+    await _save_fsm(key, 'data', data, FsmState.state)
+
+
+async def _save_fsm(key: str, column: str, value: str | None, other):
+    await _upsert(FsmState, [{'key': key, column: value, 'updated_at': datetime.datetime.utcnow()}],
+                  [column, 'updated_at'])
+    if value is None:
+        async with use_session() as session:
+            await session.execute(delete(FsmState).where(FsmState.key == key, other == None))
+            await session.commit()
+    fsm_cache.invalidate(key)
+
+
+async def purge_fsm(max_age: float) -> int:
+    before = datetime.datetime.utcnow() - datetime.timedelta(seconds=max_age)
+    async with use_session() as session:
+        result = await session.execute(delete(FsmState).where(FsmState.updated_at < before))
+        await session.commit()
+    if result.rowcount:
+        fsm_cache.clear()
+    return result.rowcount
+
+
+async def get_fsm_stats(max_age: float) -> dict:
+    before = datetime.datetime.utcnow() - datetime.timedelta(seconds=max_age)
+    query = select(func.count(), func.count().filter(FsmState.updated_at < before),
+                   func.coalesce(func.sum(func.length(FsmState.data)), 0))
+    async with use_session() as session:
+        rows, expired, data_bytes = (await session.execute(query)).one()
+    return {'rows': rows, 'expired': expired, 'data_bytes': data_bytes}
+
+
+# Рядок для кешу: від'єднаний від сесії, тож спільний об'єкт не потрапить у flush чужого оновлення
+async def _load_row(model, key):
+    async with use_session() as session:
+        row = await session.get(model, key, populate_existing=True)
+        if row is not None:
+            session.expunge(row)
+        return row
+
+
+def _insert(model):
+    return postgresql_insert(model) if get_async_engine().dialect.name == 'postgresql' else sqlite_insert(model)
 
 
-def delete_settings(chat_id: int):
-    session.query(DefaultSettings).filter(DefaultSettings.chat_id == chat_id).delete()
-    session.commit()
+# INSERT ... ON CONFLICT (первинний ключ) DO UPDATE: один атомарний запит замість SELECT + INSERT/UPDATE,
+# тож одночасні записи одного рядка не падають на дублікаті ключа. Рядки пакета мають однаковий набір колонок.
+async def _upsert(model, rows: list[dict], update_columns: list[str]):
+    if not rows:
+        return
+    key = [column.name for column in model.__table__.primary_key.columns]
+    async with use_session() as session:
+        for i in range(0, len(rows), upsert_chunk_size):
+            statement = _insert(model).values(rows[i:i + upsert_chunk_size])
+            statement = statement.on_conflict_do_update(
+                index_elements=key, set_={column: statement.excluded[column] for column in update_columns})
+            await session.execute(statement)
+        await session.commit()
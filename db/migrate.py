@@ -0,0 +1,34 @@
+import argparse
+import logging
+
+from db.migrations import migrate, pending_migrations, current_version
+from db.models import get_engine
+from utils.token_vault import token_vault
+
+
+# python -m db.migrate [--status] [--target N]; на Heroku запускається в release-фазі (Procfile)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    parser.add_argument('--status', action='store_true', help="show the current version and pending migrations")
+    parser.add_argument('--target', type=int, default=None, help="stop after this version")
+    args = parser.parse_args(argv)
+
+    engine = get_engine()
+    if args.status:
+        print(f"Current version: {current_version(engine)}")
+        for version, description, _ in pending_migrations(engine):
+            print(f"Pending {version}: {description}")
+        return
+
+    try:
+        token_vault.require_key()
+    except RuntimeError as e:
+        raise SystemExit(f"{e}: refusing to migrate, stored Asana tokens would not be encrypted")
+
+    applied = migrate(engine, args.target)
+    print(f"Applied migrations: {', '.join(map(str, applied))}" if applied else "Schema is up to date")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,180 @@
+import datetime
+import logging
+
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Float, Index, Integer, MetaData, String, Table, Text, \
+    column, false, func, inspect, select, table, text, update
+from sqlalchemy.schema import CreateColumn, CreateIndex
+
+from .models import SchemaVersion
+from utils.config import default_digest_time, default_timezone
+from utils.token_vault import token_vault
+
+
+# Кожен крок описує свою схему сам (Table/Column на момент міграції), а не бере її з db.models:
+# зміна моделі не повинна міняти те, що створює вже випущена версія.
+# Кроки ідемпотентні: бази, створені ще через create_all, вже мають частину таблиць і колонок,
+# тож кожна міграція лише дописує те, чого бракує.
+def _create_tables(connection, *tables):
+    for new_table in tables:
+        new_table.create(connection, checkfirst=True)
+
+
+def _add_columns(connection, table_name, *columns):
+    new_columns = Table(table_name, MetaData(), *columns)
+    existing = {info['name'] for info in inspect(connection).get_columns(table_name)}
+    preparer = connection.dialect.identifier_preparer
+    for new_column in new_columns.columns:
+        if new_column.name in existing:
+            continue
+        ddl = CreateColumn(new_column).compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE {preparer.format_table(new_columns)} ADD COLUMN {ddl}"))
+
+
+def _create_indexes(connection, *indexes):
+    for index in indexes:
+        connection.execute(CreateIndex(index, if_not_exists=True))
+
+
+def _initial(connection):
+    metadata = MetaData()
+    users = Table(
+        'Users', metadata,
+        Column('tg_id', BigInteger, primary_key=True),
+        Column('tg_first_name', String, nullable=False),
+        Column('tg_username', String, nullable=True),
+        Column('asana_token', String, nullable=True),
+        Column('asana_refresh_token', String, nullable=True),
+        Column('asana_id', String, nullable=False),
+    )
+    default_settings = Table(
+        'DefaultSettings', metadata,
+        Column('chat_id', BigInteger, primary_key=True),
+        Column('workspace_id', String, nullable=False),
+        Column('workspace_name', String, nullable=False),
+        Column('project_id', String, nullable=True),
+        Column('project_name', String, nullable=True),
+        Column('section_id', String, nullable=True),
+        Column('section_name', String, nullable=True),
+        Column('notification_user_id', BigInteger, nullable=False),
+        Column('toggle_stickers', Boolean, nullable=False),
+    )
+    _create_tables(connection, users, default_settings)
+
+
+def _notify_empty(connection):
+    _add_columns(connection, 'Users', Column('notify_empty', Boolean, nullable=False, server_default=false()))
+
+
+def _digest_time(connection):
+    _add_columns(connection, 'DefaultSettings',
+                 Column('digest_time', String(5), nullable=False, server_default=default_digest_time),
+                 Column('timezone', String, nullable=False, server_default=default_timezone))
+
+
+def _due_today(connection):
+    metadata = MetaData()
+    due_today_tasks = Table(
+        'DueTodayTasks', metadata,
+        Column('project_id', String, primary_key=True),
+        Column('due_on', String(10), primary_key=True),
+        Column('task_gid', String, primary_key=True),
+        Column('task_name', String, nullable=False),
+        Column('assignee_gid', String, nullable=False, index=True),
+    )
+    due_today_projects = Table(
+        'DueTodayProjects', metadata,
+        Column('project_id', String, primary_key=True),
+        Column('computed_at', DateTime, nullable=True),
+    )
+    _create_tables(connection, due_today_tasks, due_today_projects)
+
+
+def _job_runs(connection):
+    job_runs = Table(
+        'JobRuns', MetaData(),
+        Column('id', Integer, primary_key=True, autoincrement=True),
+        Column('job_name', String, nullable=False, index=True),
+        Column('started_at', DateTime, nullable=False, index=True),
+        Column('duration', Float, nullable=False),
+        Column('status', String, nullable=False),
+        Column('asana_calls', Integer, nullable=False),
+        Column('tasks_scanned', Integer, nullable=False),
+        Column('messages_sent', Integer, nullable=False),
+        Column('messages_failed', Integer, nullable=False),
+        Column('token_refreshes', Integer, nullable=False),
+        Column('error_count', Integer, nullable=False),
+        Column('details', Text, nullable=True),
+    )
+    _create_tables(connection, job_runs)
+
+
+def _user_lookup_indexes(connection):
+    if not inspect(connection).has_table('Users'):
+        return
+    users = Table('Users', MetaData(), Column('asana_id', String), Column('tg_username', String))
+    _create_indexes(connection,
+                    Index('ix_Users_asana_id', users.c.asana_id),
+                    Index('ix_Users_tg_username_lower', func.lower(users.c.tg_username)))
+
+
+def _fsm_states(connection):
+    fsm_states = Table(
+        'FsmStates', MetaData(),
+        Column('key', String, primary_key=True),
+        Column('state', String, nullable=True),
+        Column('data', Text, nullable=True),
+        Column('updated_at', DateTime, nullable=False, index=True),
+    )
+    _create_tables(connection, fsm_states)
+
+
+def _encrypt_tokens(connection):
+    token_vault.require_key()
+    # Сирі значення колонок, без шифрування/розшифрування типу EncryptedToken
+    users = table('Users', column('tg_id'), column('asana_token', String), column('asana_refresh_token', String))
+    rows = connection.execute(select(users.c.tg_id, users.c.asana_token, users.c.asana_refresh_token)).all()
+    for tg_id, access_token, refresh_token in rows:
+        if token_vault.is_sealed(access_token) and token_vault.is_sealed(refresh_token):
+            continue
+        connection.execute(update(users).where(users.c.tg_id == tg_id).values(
+            asana_token=token_vault.seal(access_token), asana_refresh_token=token_vault.seal(refresh_token)))
+
+
+# (версія, опис, крок). Нова міграція додається в кінець з наступною версією; застосовані не змінюються.
+MIGRATIONS = [
+    (1, 'Users and DefaultSettings tables', _initial),
+    (2, 'Users.notify_empty', _notify_empty),
+    (3, 'DefaultSettings.digest_time and timezone', _digest_time),
+    (4, 'DueTodayTasks and DueTodayProjects tables', _due_today),
+    (5, 'JobRuns table', _job_runs),
+    (6, 'Users asana_id and lower(tg_username) indexes', _user_lookup_indexes),
+    (7, 'FsmStates table', _fsm_states),
+    (8, 'Encrypt stored Asana tokens', _encrypt_tokens),
+]
+
+
+def current_version(engine) -> int:
+    with engine.begin() as connection:
+        SchemaVersion.__table__.create(connection, checkfirst=True)
+        versions = connection.execute(select(SchemaVersion.version)).scalars().all()
+    return max(versions, default=0)
+
+
+def pending_migrations(engine) -> list[tuple]:
+    version = current_version(engine)
+    return [migration for migration in MIGRATIONS if migration[0] > version]
+
+
+# Кожна міграція виконується у власній транзакції разом із записом своєї версії
+def migrate(engine, target: int | None = None) -> list[int]:
+    applied = []
+    for version, description, upgrade in pending_migrations(engine):
+        if target is not None and version > target:
+            break
+        with engine.begin() as connection:
+            upgrade(connection)
+            connection.execute(SchemaVersion.__table__.insert().values(
+                version=version, description=description, applied_at=datetime.datetime.utcnow()))
+        logging.info(f"Applied migration {version}: {description}")
+        applied.append(version)
+    return applied
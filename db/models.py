@@ -1,21 +1,42 @@
 from traitlets import Bool
-from utils.config import db_url
-from sqlalchemy import Boolean, Column, String, BigInteger, create_engine
+from utils.config import db_url, async_db_url, default_digest_time, default_timezone
+from utils.token_vault import token_vault
+from sqlalchemy import Boolean, Column, String, BigInteger, DateTime, Float, Index, Integer, Text, TypeDecorator, \
+    create_engine, false, func
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 
 Base = declarative_base()
 
 
+# Токен, що зберігається зашифрованим (utils.token_vault): шифрується при записі, при читанні
+# розшифровується через кеш сховища, тож атрибут моделі завжди містить відкритий токен
+class EncryptedToken(TypeDecorator):
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return token_vault.seal(value)
+
+    def process_result_value(self, value, dialect):
+        return token_vault.open(value)
+
+
 class Users(Base):
     __tablename__ = 'Users'
 
     tg_id = Column(BigInteger, primary_key=True)
     tg_first_name = Column(String, nullable=False)
     tg_username = Column(String, nullable=True)
-    asana_token = Column(String, nullable=True)
-    asana_refresh_token = Column(String, nullable=True)
-    asana_id = Column(String, nullable=False)
+    asana_token = Column(EncryptedToken, nullable=True)
+    asana_refresh_token = Column(EncryptedToken, nullable=True)
+    asana_id = Column(String, nullable=False, index=True)
+    # Надсилати щоденне нагадування навіть коли задач на сьогодні немає
+    notify_empty = Column(Boolean, nullable=False, default=False, server_default=false())
+
+    # Username в Telegram не залежить від регістру - шукаємо за lower(tg_username)
+    __table_args__ = (Index('ix_Users_tg_username_lower', func.lower(tg_username)),)
 
 
 class DefaultSettings(Base):
@@ -30,15 +51,91 @@ class DefaultSettings(Base):
     section_name = Column(String, nullable=True)
     notification_user_id = Column(BigInteger, nullable=False)
     toggle_stickers = Column(Boolean, nullable=False)
+    # Час щоденного нагадування (HH:MM) в часовому поясі чату
+    digest_time = Column(String(5), nullable=False, default=default_digest_time, server_default=default_digest_time)
+    timezone = Column(String, nullable=False, default=default_timezone, server_default=default_timezone)
+
+
+# Задачі з датою на конкретний день, обчислені заздалегідь із знімків проектів (utils.due_today)
+class DueTodayTask(Base):
+    __tablename__ = 'DueTodayTasks'
+
+    project_id = Column(String, primary_key=True)
+    due_on = Column(String(10), primary_key=True)
+    task_gid = Column(String, primary_key=True)
+    task_name = Column(String, nullable=False)
+    assignee_gid = Column(String, nullable=False, index=True)
+
+
+# Коли проект востаннє перераховано; без свіжого запису читання йдуть напряму в Asana
+class DueTodayProject(Base):
+    __tablename__ = 'DueTodayProjects'
+
+    project_id = Column(String, primary_key=True)
+    computed_at = Column(DateTime, nullable=True)
+
+
+# Звіт про запуск запланованої задачі (utils.job_report)
+class JobRun(Base):
+    __tablename__ = 'JobRuns'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_name = Column(String, nullable=False, index=True)
+    started_at = Column(DateTime, nullable=False, index=True)
+    duration = Column(Float, nullable=False)
+    status = Column(String, nullable=False)
+    asana_calls = Column(Integer, nullable=False, default=0)
+    tasks_scanned = Column(Integer, nullable=False, default=0)
+    messages_sent = Column(Integer, nullable=False, default=0)
+    messages_failed = Column(Integer, nullable=False, default=0)
+    token_refreshes = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    # JSON: найповільніші проекти та перші помилки
+    details = Column(Text, nullable=True)
+
+
+# Стан і дані FSM aiogram (bot.fsm_storage); рядок без змін довше за FSM_STATE_TTL вважається покинутим
+class FsmState(Base):
+    __tablename__ = 'FsmStates'
+
+    key = Column(String, primary_key=True)
+    state = Column(String, nullable=True)
+    # JSON
+    data = Column(Text, nullable=True)
+    updated_at = Column(DateTime, nullable=False, index=True)
+
+
+# Застосовані міграції схеми (db.migrations)
+class SchemaVersion(Base):
+    __tablename__ = 'schema_version'
+
+    version = Column(Integer, primary_key=True)
+    description = Column(String, nullable=False)
+    applied_at = Column(DateTime, nullable=False)
+
+
+# Підключення до бази даних створюються при першому зверненні: імпорт моделей не робить I/O,
+# а схему створює і оновлює лише python -m db.migrate (див. db.migrations).
+# Бот працює через асинхронний engine (asyncpg / aiosqlite), синхронний - для міграцій і сховища задач APScheduler
+_engine = None
+_async_engine = None
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = create_engine(db_url)
+    return _engine
 
 
-# Підключення до бази даних
-engine = create_engine(db_url)
-Session = sessionmaker(bind=engine)
-session = Session()
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        # aiosqlite тримає з'єднання у власних потоках, прив'язаних до event loop; для SQLite їх не кешуємо
+        _async_engine = create_async_engine(async_db_url, poolclass=NullPool) if async_db_url.startswith('sqlite') \
+            else create_async_engine(async_db_url)
+    return _async_engine
 
-# Створення таблиць
-Base.metadata.create_all(engine)
 
-# Закриття сесії
-session.close()
+# Сесії прив'язуються до engine при створенні (db.session.session_scope)
+Session = async_sessionmaker(expire_on_commit=False)
@@ -0,0 +1,49 @@
+import time
+
+from utils.config import db_cache_ttl, db_cache_size
+from utils.ttl_cache import TTLCache
+
+_MISSING = object()
+
+
+# Кеш рядків бази в пам'яті процесу (користувачі, налаштування чатів) з обмеженим розміром.
+# Ці рядки змінюються лише функціями db.functions, які після запису викликають invalidate;
+# TTL рахується від завантаження і обмежує вік рядка, навіть якщо його постійно читають.
+# Кешується і відсутність рядка (None), щоб незареєстровані користувачі не ходили в базу на кожне повідомлення.
+class RowCache:
+    def __init__(self, ttl: float = db_cache_ttl, maxsize: int = db_cache_size):
+        self.ttl = ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Лічильник інвалідацій: рядок, що вантажився під час запису, не потрапляє в кеш
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key, load):
+        item = self._cache.get(key, _MISSING)
+        if item is not _MISSING and item[1] > time.monotonic():
+            self.hits += 1
+            return item[0]
+        self.misses += 1
+        generation = self._generation
+        value = await load()
+        if generation == self._generation:
+            self._cache.set(key, (value, time.monotonic() + self.ttl))
+        return value
+
+    def invalidate(self, key):
+        self._generation += 1
+        self._cache.invalidate(key)
+
+    def clear(self):
+        self._generation += 1
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {'size': len(self._cache), 'hits': self.hits, 'misses': self.misses}
+
+
+users_cache = RowCache()
+settings_cache = RowCache()
+# Рядки FsmStates: FSMContextMiddleware читає стан на кожне оновлення, а рядок є лише в чатах із незавершеним сценарієм
+fsm_cache = RowCache()
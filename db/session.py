@@ -0,0 +1,40 @@
+import contextlib
+import contextvars
+
+from .models import Session, get_async_engine
+
+# Сесія поточного оновлення Telegram (див. bot.middlewares.DbSessionMiddleware)
+current_session = contextvars.ContextVar('db_session', default=None)
+
+
+# Нова сесія на одне оновлення чи одну фонову операцію; помилка відкочує лише її транзакцію
+@contextlib.asynccontextmanager
+async def session_scope():
+    session = Session(bind=get_async_engine())
+    token = current_session.set(session)
+    try:
+        yield session
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        current_session.reset(token)
+        await session.close()
+
+
+# Сесія оновлення, якщо вона є, інакше - коротка власна (планувальник, фонові задачі)
+@contextlib.asynccontextmanager
+async def use_session():
+    session = current_session.get()
+    if session is not None:
+        yield session
+        return
+    async with session_scope() as session:
+        yield session
+
+
+# Перше підключення engine ініціалізує діалект під блокуванням потоку: два одночасні перші підключення
+# в одному event loop чекають одне на одного назавжди. Тому підключаємось один раз до початку роботи.
+async def warm_up_engine():
+    async with get_async_engine().connect():
+        pass
@@ -0,0 +1,68 @@
+import threading
+
+from sqlalchemy import select
+
+from .models import Users
+from .session import use_session
+
+
+# Індекс користувачів бота в пам'яті: asana_id -> tg_id, множина всіх tg_id
+# та тих, хто хоче отримувати нагадування навіть без задач.
+# Завантажується на початку розсилки, далі підтримується create_user/delete_user,
+# тож цикл по задачах обходиться без запитів до бази.
+class UserIndex:
+    def __init__(self):
+        self._tg_ids: dict[str, int] = {}
+        self._asana_ids: dict[int, str | None] = {}
+        self._notify_empty: set[int] = set()
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    async def load(self):
+        async with use_session() as session:
+            rows = (await session.execute(select(Users.tg_id, Users.asana_id, Users.notify_empty))).all()
+        with self._lock:
+            self._tg_ids.clear()
+            self._asana_ids.clear()
+            self._notify_empty.clear()
+            for tg_id, asana_id, notify_empty in rows:
+                self._put(tg_id, asana_id)
+                if notify_empty:
+                    self._notify_empty.add(tg_id)
+            self.loaded = True
+
+    def tg_id(self, asana_id: str) -> int | None:
+        return self._tg_ids.get(asana_id)
+
+    def notify_empty_ids(self) -> set[int]:
+        with self._lock:
+            return set(self._notify_empty)
+
+    def set_notify_empty(self, tg_id: int, enabled: bool):
+        with self._lock:
+            if enabled:
+                self._notify_empty.add(tg_id)
+            else:
+                self._notify_empty.discard(tg_id)
+
+    def put(self, tg_id: int, asana_id: str | None):
+        with self._lock:
+            self._put(tg_id, asana_id)
+
+    def remove(self, tg_id: int):
+        with self._lock:
+            asana_id = self._asana_ids.pop(tg_id, None)
+            self._notify_empty.discard(tg_id)
+            if asana_id is not None and self._tg_ids.get(asana_id) == tg_id:
+                del self._tg_ids[asana_id]
+
+    def _put(self, tg_id: int, asana_id: str | None):
+        old_asana_id = self._asana_ids.get(tg_id)
+        if old_asana_id is not None and self._tg_ids.get(old_asana_id) == tg_id:
+            del self._tg_ids[old_asana_id]
+        self._asana_ids[tg_id] = asana_id
+        if asana_id is not None:
+            self._tg_ids[asana_id] = tg_id
+
+
+user_index = UserIndex()
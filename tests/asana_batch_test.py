@@ -0,0 +1,73 @@
+import asyncio
+import unittest
+
+from utils.asana_batch import AsanaBatchExecutor, batch_action
+from utils.asana_client import AsanaError
+
+
+class FakeAsanaClient:
+    def __init__(self, access_token='token'):
+        self.access_token = access_token
+        self.batches = []
+        self.costs = []
+        self.requests = []
+
+    async def post(self, path, data, params=None, cost=1):
+        self.batches.append(data['actions'])
+        self.costs.append(cost)
+        responses = []
+        for action in data['actions']:
+            if action['relative_path'] == '/tasks/missing':
+                responses.append({'status_code': 404, 'body': {'errors': [{'message': 'Not found'}]}})
+            else:
+                responses.append({'status_code': 200, 'body': {'data': {'gid': action['relative_path'][7:]}}})
+        return responses
+
+    async def request(self, method, path, params=None, data=None):
+        self.requests.append((method, path, params, data))
+        return {'data': {'gid': path[7:]}}
+
+
+class TestAsanaBatchExecutor(unittest.IsolatedAsyncioTestCase):
+
+    async def test_execute_chunks_by_ten(self):
+        asana_client = FakeAsanaClient()
+        actions = [batch_action('GET', f'/tasks/{i}', fields='name,notes') for i in range(23)]
+        results = await AsanaBatchExecutor().execute(asana_client, actions)
+
+        self.assertEqual([len(batch) for batch in asana_client.batches], [10, 10, 3])
+        self.assertEqual(asana_client.costs, [10, 10, 3])
+        self.assertEqual([result['gid'] for result in results], [str(i) for i in range(23)])
+        self.assertEqual(asana_client.batches[0][0]['options'], {'fields': ['name', 'notes']})
+
+    async def test_per_action_errors(self):
+        actions = [batch_action('GET', '/tasks/1'), batch_action('GET', '/tasks/missing')]
+        results = await AsanaBatchExecutor().execute(FakeAsanaClient(), actions)
+
+        self.assertEqual(results[0], {'gid': '1'})
+        self.assertIsInstance(results[1], AsanaError)
+        self.assertEqual(results[1].status, 404)
+
+    async def test_single_action_is_plain_request(self):
+        asana_client = FakeAsanaClient()
+        results = await AsanaBatchExecutor().execute(asana_client, [batch_action('PUT', '/tasks/1', {'notes': 'x'})])
+
+        self.assertEqual(results, [{'gid': '1'}])
+        self.assertEqual(asana_client.batches, [])
+        self.assertEqual(asana_client.requests, [('PUT', '/tasks/1', None, {'notes': 'x'})])
+
+    async def test_call_coalesces_concurrent_actions(self):
+        asana_client = FakeAsanaClient()
+        batcher = AsanaBatchExecutor(window=0.01)
+        results = await asyncio.gather(batcher.call(asana_client, 'GET', '/tasks/1'),
+                                       batcher.call(asana_client, 'GET', '/tasks/2'),
+                                       batcher.call(asana_client, 'GET', '/tasks/missing'),
+                                       return_exceptions=True)
+
+        self.assertEqual(len(asana_client.batches), 1)
+        self.assertEqual(results[:2], [{'gid': '1'}, {'gid': '2'}])
+        self.assertIsInstance(results[2], AsanaError)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from unittest import mock
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from utils import asana_client as asana_client_module
+from utils.asana_client import AsanaClient, AsanaError
+
+
+class TestAsanaClient(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.requests = []
+        app = web.Application()
+        app.router.add_get('/api/1.0/projects/1/tasks', self.tasks)
+        app.router.add_get('/api/1.0/users/me', self.me)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        patcher = mock.patch.object(asana_client_module, 'api_url', str(self.server.make_url('/api/1.0')))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await asana_client_module.close_session()
+        await self.server.close()
+
+    async def tasks(self, request):
+        self.requests.append(dict(request.query))
+        if request.query.get('offset') == 'page2':
+            return web.json_response({'data': [{'gid': '3'}], 'next_page': None})
+        return web.json_response({'data': [{'gid': '1'}, {'gid': '2'}], 'next_page': {'offset': 'page2'}})
+
+    async def me(self, request):
+        if request.headers['Authorization'] != 'Bearer new':
+            return web.json_response({'errors': [{'message': 'Not Authorized'}]}, status=401)
+        return web.json_response({'data': {'gid': '42'}})
+
+    async def test_iterate_follows_pages(self):
+        tasks = await AsanaClient('token').collect('/projects/1/tasks', {'completed_since': 'now'})
+        self.assertEqual([task['gid'] for task in tasks], ['1', '2', '3'])
+        self.assertEqual(self.requests[1]['offset'], 'page2')
+        self.assertEqual(self.requests[1]['completed_since'], 'now')
+
+    async def test_refreshes_once_on_401(self):
+        failed_tokens = []
+
+        async def refresher(failed_token):
+            failed_tokens.append(failed_token)
+            return 'new'
+
+        asana_client = AsanaClient('old', refresher=refresher)
+        self.assertEqual(await asana_client.get('/users/me'), {'gid': '42'})
+        self.assertEqual(failed_tokens, ['old'])
+        self.assertEqual(asana_client.access_token, 'new')
+
+    async def test_error_without_refresher(self):
+        with self.assertRaises(AsanaError) as error:
+            await AsanaClient('old').get('/users/me')
+        self.assertEqual(error.exception.status, 401)
+        self.assertEqual(error.exception.message, 'Not Authorized')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import text
+
+from db.functions import create_user, get_user, delete_user, toggle_notify_empty, create_default_settings_private, \
+    get_default_settings, toggle_stickers, delete_settings, get_asana_ids_by_usernames, get_asana_id_by_username, \
+    create_default_settings, upsert_users
+from db.migrations import migrate
+from db.models import Session, Users, get_async_engine, get_engine
+from db.row_cache import users_cache
+from db.session import session_scope, current_session, warm_up_engine
+from utils.token_encryption import generate_key
+from utils.token_vault import token_vault
+
+
+# Ключ сховища токенів тестам задається тут: TOKEN_VAULT_KEY в середовищі не потрібен
+vault_key = patch.object(token_vault, 'key', generate_key())
+
+
+def setUpModule():
+    vault_key.start()
+    migrate(get_engine())
+
+
+def tearDownModule():
+    vault_key.stop()
+
+
+class TestDbFunctions(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        await warm_up_engine()
+
+    async def asyncTearDown(self):
+        await delete_user(1)
+        await delete_user(2)
+
+    async def test_create_and_toggle(self):
+        await create_user(1, 'First', 'first', 'token', 'refresh', 'a1')
+        self.assertEqual((await get_user(1)).asana_id, 'a1')
+        self.assertTrue(await toggle_notify_empty(1))
+        self.assertIsNone(await toggle_notify_empty(999))
+
+    async def test_update_sessions_are_isolated(self):
+        async def update(tg_id):
+            async with session_scope() as session:
+                await create_user(tg_id, 'User', None, None, None, f'a{tg_id}')
+                return session
+
+        sessions = await asyncio.gather(update(1), update(2))
+        self.assertIsNot(sessions[0], sessions[1])
+        self.assertIsNone(current_session.get())
+
+    async def test_reads_rows_written_elsewhere(self):
+        await create_user(1, 'User', None, 't1', 'r', 'a1')
+        self.assertEqual((await get_user(1)).asana_token, 't1')
+
+        # Запис з іншої сесії (інше оновлення чи інший процес)
+        async with Session(bind=get_async_engine()) as other:
+            (await other.get(Users, 1)).asana_token = 't2'
+            await other.commit()
+
+        # Кеш не знає про чужий запис, свіже читання бачить його
+        self.assertEqual((await get_user(1)).asana_token, 't1')
+        self.assertEqual((await get_user(1, fresh=True)).asana_token, 't2')
+
+    async def test_cached_rows_are_invalidated_by_writes(self):
+        self.assertIsNone(await get_user(1))
+        misses = users_cache.misses
+        self.assertIsNone(await get_user(1))
+        self.assertEqual(users_cache.misses, misses)
+
+        await create_user(1, 'User', None, 't1', 'r', 'a1')
+        self.assertEqual((await get_user(1)).asana_token, 't1')
+        await create_user(1, 'User', None, 't2', 'r', 'a1')
+        self.assertEqual((await get_user(1)).asana_token, 't2')
+        await delete_user(1)
+        self.assertIsNone(await get_user(1))
+
+        await create_default_settings_private(-5, 'w1', 'Workspace', 1)
+        self.assertTrue((await get_default_settings(-5)).toggle_stickers)
+        await toggle_stickers(-5)
+        self.assertFalse((await get_default_settings(-5)).toggle_stickers)
+        await delete_settings(-5)
+        self.assertIsNone(await get_default_settings(-5))
+
+    async def test_resolves_usernames_case_insensitively(self):
+        await create_user(1, 'First', 'First_User', None, None, 'a1')
+        await create_user(2, 'Second', 'second', None, None, 'a2')
+
+        self.assertEqual(await get_asana_ids_by_usernames(['first_user', 'SECOND', 'missing']),
+                         {'first_user': 'a1', 'SECOND': 'a2', 'missing': None})
+        self.assertIsNone(await get_asana_id_by_username('missing'))
+
+    async def test_tokens_are_stored_encrypted(self):
+        await create_user(1, 'User', 'user', 'token', 'refresh', 'a1')
+        await create_user(1, 'User', 'user', 'token2', 'refresh2', 'a1')
+        async with session_scope() as session:
+            stored = (await session.execute(text(
+                'SELECT asana_token, asana_refresh_token FROM "Users" WHERE tg_id = 1'))).one()
+        self.assertTrue(all(token_vault.is_sealed(value) for value in stored))
+        user = await get_user(1, fresh=True)
+        self.assertEqual((user.asana_token, user.asana_refresh_token), ('token2', 'refresh2'))
+
+    async def test_concurrent_upserts_of_one_user(self):
+        await asyncio.gather(*[create_user(1, 'User', 'user', f't{i}', 'r', 'a1') for i in range(5)])
+        self.assertIn((await get_user(1)).asana_token, {f't{i}' for i in range(5)})
+
+    async def test_upsert_keeps_untouched_columns(self):
+        await upsert_users([dict(tg_id=tg_id, tg_first_name='User', tg_username=f'user{tg_id}', asana_token='t1',
+                                 asana_refresh_token='r', asana_id=f'a{tg_id}') for tg_id in (1, 2)])
+        await create_user(1, 'Renamed', 'renamed', 't2', 'r', 'a1')
+        user = await get_user(1)
+        self.assertEqual((user.asana_token, user.tg_first_name), ('t2', 'User'))
+        self.assertEqual((await get_user(2)).asana_token, 't1')
+
+        await create_default_settings(-5, 'w1', 'Workspace', 'p1', 'Project', 's1', 'Section', 1)
+        await create_default_settings_private(-5, 'w2', 'Other', 1)
+        settings = await get_default_settings(-5)
+        self.assertEqual((settings.workspace_id, settings.project_id), ('w2', 'p1'))
+        await delete_settings(-5)
+
+    async def test_failed_update_does_not_poison_later_ones(self):
+        with self.assertRaises(RuntimeError):
+            async with session_scope():
+                await create_user(1, 'User', None, None, None, 'a1')
+                raise RuntimeError('handler failed')
+        await create_user(2, 'User', None, None, None, 'a2')
+        self.assertIsNotNone(await get_user(2))
+
+
+if __name__ == "__main__":
+    unittest.main()
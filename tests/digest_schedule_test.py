@@ -0,0 +1,41 @@
+import unittest
+
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from utils.config import default_digest_time, default_timezone
+from utils.digest_schedule import apply_digest_slots, digest_job_id, digest_jobstore, parse_digest_time
+
+
+class TestDigestSchedule(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.scheduler = AsyncIOScheduler(jobstores={digest_jobstore: MemoryJobStore()})
+        self.scheduler.start(paused=True)
+
+    async def asyncTearDown(self):
+        self.scheduler.shutdown(wait=False)
+
+    def job_ids(self):
+        return {job.id for job in self.scheduler.get_jobs(jobstore=digest_jobstore)}
+
+    async def test_one_job_per_slot(self):
+        apply_digest_slots({('08:30', 'Europe/Warsaw'), ('08:30', 'Europe/Warsaw')}, self.scheduler)
+        self.assertEqual(self.job_ids(), {digest_job_id('08:30', 'Europe/Warsaw'),
+                                          digest_job_id(default_digest_time, default_timezone)})
+        job = self.scheduler.get_job(digest_job_id('08:30', 'Europe/Warsaw'))
+        self.assertEqual(job.args, ('08:30', 'Europe/Warsaw'))
+
+    async def test_unused_slots_are_removed(self):
+        apply_digest_slots({('07:00', 'UTC')}, self.scheduler)
+        apply_digest_slots(set(), self.scheduler)
+        self.assertEqual(self.job_ids(), {digest_job_id(default_digest_time, default_timezone)})
+
+    def test_parse_digest_time(self):
+        self.assertEqual(parse_digest_time('8:05'), '08:05')
+        self.assertIsNone(parse_digest_time('24:00'))
+        self.assertIsNone(parse_digest_time('завтра'))
+
+
+if __name__ == "__main__":
+    unittest.main()
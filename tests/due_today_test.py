@@ -0,0 +1,40 @@
+import datetime
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from utils import due_today
+from utils.task_snapshot import ProjectTaskSnapshot
+
+
+class TestDueToday(unittest.IsolatedAsyncioTestCase):
+
+    async def test_compute_project_stores_today_and_tomorrow(self):
+        today = datetime.datetime.now(due_today.pytz.timezone('UTC')).date()
+        tomorrow = today + datetime.timedelta(days=1)
+        snapshot = ProjectTaskSnapshot('p1')
+        snapshot.put({'gid': '1', 'name': 'Today', 'assignee': {'gid': 'a1'}, 'due_on': today.isoformat()})
+        snapshot.put({'gid': '2', 'name': 'Tomorrow', 'assignee': {'gid': 'a1'}, 'due_on': tomorrow.isoformat()})
+        snapshot.put({'gid': '3', 'name': 'Unassigned', 'assignee': None, 'due_on': today.isoformat()})
+        snapshot.put({'gid': '4', 'name': 'Later', 'assignee': {'gid': 'a1'}, 'due_on': '2999-01-01'})
+        stored = []
+
+        with mock.patch.object(due_today, 'get_asana_client', mock.AsyncMock(return_value=object())), \
+                mock.patch.object(due_today.task_snapshots, 'get', mock.AsyncMock(return_value=snapshot)), \
+                mock.patch.object(due_today, 'replace_due_today_tasks',
+                                  mock.AsyncMock(side_effect=lambda *args: stored.append(args))):
+            chat = SimpleNamespace(chat_id=-1, project_id='p1', notification_user_id=1, timezone='UTC')
+            self.assertTrue(await due_today.compute_project('p1', [chat]))
+
+        project_id, dates, tasks = stored[0]
+        self.assertEqual(dates, [today.isoformat(), tomorrow.isoformat()])
+        self.assertEqual(sorted(task['gid'] for task in tasks), ['1', '2'])
+
+    async def test_failed_project_reports_false(self):
+        with mock.patch.object(due_today, 'get_asana_client', mock.AsyncMock(side_effect=RuntimeError('down'))):
+            chat = SimpleNamespace(chat_id=-1, project_id='p1', notification_user_id=1, timezone='UTC')
+            self.assertFalse(await due_today.compute_project('p1', [chat]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from utils.executor import BlockingExecutor
+
+
+class TestBlockingExecutor(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.executor = BlockingExecutor(max_workers=4, per_user_limit=1)
+
+    async def asyncTearDown(self):
+        self.executor.shutdown()
+
+    async def test_per_user_limit(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def work(user):
+            with lock:
+                running.append(user)
+                peak.append(running.count(1))
+            time.sleep(0.02)
+            with lock:
+                running.remove(user)
+            return user
+
+        results = await asyncio.gather(*[self.executor.run(work, 1, user_id=1) for _ in range(3)],
+                                       self.executor.run(work, 2, user_id=2))
+
+        self.assertEqual(results, [1, 1, 1, 2])
+        self.assertEqual(max(peak), 1)
+        self.assertEqual(self.executor.stats()['users'], 0)
+
+    async def test_passes_arguments(self):
+        self.assertEqual(await self.executor.run(pow, 2, 10), 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
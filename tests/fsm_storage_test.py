@@ -0,0 +1,93 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from aiogram.fsm.storage.base import StorageKey
+from sqlalchemy import event
+
+from bot.fsm_storage import DbStorage
+from db.migrations import migrate
+from db.models import get_async_engine, get_engine
+from db.session import warm_up_engine
+from utils.states.report_task import ReportTask
+from utils.token_encryption import generate_key
+from utils.token_vault import token_vault
+
+
+# Ключ сховища токенів тестам задається тут: TOKEN_VAULT_KEY в середовищі не потрібен
+vault_key = patch.object(token_vault, 'key', generate_key())
+
+
+def setUpModule():
+    vault_key.start()
+    migrate(get_engine())
+
+
+def tearDownModule():
+    vault_key.stop()
+
+
+class TestDbStorage(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        await warm_up_engine()
+        self.storage = DbStorage(ttl=60)
+        self.key = StorageKey(bot_id=1, chat_id=-10, user_id=5, destiny='default')
+
+    async def asyncTearDown(self):
+        await self.storage.set_state(self.key, None)
+        await self.storage.set_data(self.key, {})
+
+    async def test_state_and_data_round_trip(self):
+        await self.storage.set_state(self.key, ReportTask.TaskName)
+        await self.storage.update_data(self.key, {'task_gids': ['1', '2']})
+
+        self.assertEqual(await self.storage.get_state(self.key), ReportTask.TaskName.state)
+        self.assertEqual(await self.storage.get_data(self.key), {'task_gids': ['1', '2']})
+
+    async def test_clear_removes_row(self):
+        await self.storage.set_state(self.key, ReportTask.TaskName)
+        await self.storage.set_data(self.key, {'task_gid': '1'})
+        rows = (await self.storage.stats())['rows']
+
+        await self.storage.set_state(self.key, None)
+        await self.storage.set_data(self.key, {})
+        self.assertEqual((await self.storage.stats())['rows'], rows - 1)
+
+    async def test_idle_state_expires(self):
+        await self.storage.set_state(self.key, ReportTask.Report)
+        await self.storage.set_data(self.key, {'task_gid': '1'})
+        await asyncio.sleep(0.05)
+
+        expiring = DbStorage(ttl=0.01)
+        self.assertEqual((await expiring.stats())['expired'], 1)
+        self.assertEqual(await expiring.purge_expired(), 1)
+        self.assertIsNone(await self.storage.get_state(self.key))
+        self.assertEqual(await self.storage.get_data(self.key), {})
+
+    async def test_key_without_state_does_not_query(self):
+        other = StorageKey(bot_id=1, chat_id=-11, user_id=6, destiny='default')
+        self.assertIsNone(await self.storage.get_state(other))
+        queries = []
+
+        def count(*args):
+            queries.append(args)
+
+        engine = get_async_engine().sync_engine
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            self.assertIsNone(await self.storage.get_state(other))
+            self.assertEqual(await self.storage.get_data(other), {})
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        self.assertEqual(queries, [])
+
+        # Запис стану скидає кеш ключа
+        await self.storage.set_state(other, ReportTask.TaskName)
+        self.assertEqual(await self.storage.get_state(other), ReportTask.TaskName.state)
+        await self.storage.set_state(other, None)
+        self.assertIsNone(await self.storage.get_state(other))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from utils import job_report
+
+
+class TestJobReport(unittest.IsolatedAsyncioTestCase):
+
+    async def test_counters_collected_across_tasks(self):
+        saved = []
+
+        async def step(project_id):
+            with job_report.timed(f"project {project_id}"):
+                job_report.count('asana_calls', 2)
+                job_report.count('messages_sent')
+
+        with mock.patch.object(job_report, 'save_job_run', mock.AsyncMock(side_effect=saved.append)):
+            async with job_report.job_run('digest'):
+                await asyncio.gather(step('p1'), step('p2'))
+                job_report.error('project p2 failed')
+
+        row = saved[0]
+        self.assertEqual(row['job_name'], 'digest')
+        self.assertEqual(row['status'], 'partial')
+        self.assertEqual(row['asana_calls'], 4)
+        self.assertEqual(row['messages_sent'], 2)
+        self.assertEqual(row['error_count'], 1)
+        details = json.loads(row['details'])
+        self.assertEqual(sorted(key for key, _ in details['slowest']), ['project p1', 'project p2'])
+        self.assertEqual(details['errors'], ['project p2 failed'])
+
+    async def test_failed_run_is_saved(self):
+        saved = []
+        with mock.patch.object(job_report, 'save_job_run', mock.AsyncMock(side_effect=saved.append)):
+            with self.assertRaises(RuntimeError):
+                async with job_report.job_run('digest'):
+                    raise RuntimeError('boom')
+        self.assertEqual(saved[0]['status'], 'failed')
+
+    def test_count_without_run_is_noop(self):
+        job_report.count('asana_calls')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from bot import middlewares
+from bot.middlewares import RequestContextMiddleware
+from utils.refresh_token_wrap import refresh_token
+
+
+class TestRequestContextMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    async def test_injects_user_settings_and_client(self):
+        user = SimpleNamespace(tg_id=1, asana_token='token', asana_refresh_token='refresh')
+        settings = SimpleNamespace(chat_id=-1)
+        received = {}
+
+        async def handler(event, data):
+            received.update(data)
+
+        with mock.patch.object(middlewares, 'get_user', mock.AsyncMock(return_value=user)) as get_user, \
+                mock.patch.object(middlewares, 'get_default_settings', mock.AsyncMock(return_value=settings)):
+            await RequestContextMiddleware()(handler, object(), {'event_from_user': SimpleNamespace(id=1),
+                                                                 'event_chat': SimpleNamespace(id=-1)})
+
+        get_user.assert_awaited_once_with(1)
+        self.assertIs(received['user'], user)
+        self.assertIs(received['settings'], settings)
+        self.assertEqual(received['asana_client'].access_token, 'token')
+
+    async def test_update_without_user(self):
+        received = {}
+
+        async def handler(event, data):
+            received.update(data)
+
+        await RequestContextMiddleware()(handler, object(), {})
+        self.assertEqual((received['user'], received['settings'], received['asana_client']), (None, None, None))
+
+
+class TestRefreshTokenDecorator(unittest.IsolatedAsyncioTestCase):
+
+    async def test_uses_injected_user(self):
+        calls = []
+
+        @refresh_token
+        async def handler(message, user):
+            calls.append(user)
+
+        message = mock.AsyncMock()
+        await handler(message, user=None)
+        message.reply.assert_awaited_once()
+
+        user = SimpleNamespace(asana_token='token', asana_refresh_token='refresh')
+        await handler(message, user=user)
+        self.assertEqual(calls, [user])
+
+
+if __name__ == "__main__":
+    unittest.main()
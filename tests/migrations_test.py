@@ -0,0 +1,119 @@
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from db.migrations import MIGRATIONS, current_version, migrate, pending_migrations
+from db.models import Base, Users, DefaultSettings
+from utils.token_encryption import generate_key
+from utils.token_vault import token_vault
+
+# Ключ сховища токенів тестам задається тут: TOKEN_VAULT_KEY в середовищі не потрібен
+vault_key = patch.object(token_vault, 'key', generate_key())
+
+
+def setUpModule():
+    vault_key.start()
+
+
+def tearDownModule():
+    vault_key.stop()
+
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+
+    def create_baseline(self):
+        # Схема, створена create_all до появи міграцій: без notify_empty, digest_time і timezone
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                'CREATE TABLE "Users" (tg_id BIGINT PRIMARY KEY, tg_first_name VARCHAR NOT NULL, '
+                'tg_username VARCHAR, asana_token VARCHAR, asana_refresh_token VARCHAR, asana_id VARCHAR NOT NULL)'))
+            connection.execute(text(
+                'CREATE TABLE "DefaultSettings" (chat_id BIGINT PRIMARY KEY, workspace_id VARCHAR NOT NULL, '
+                'workspace_name VARCHAR NOT NULL, project_id VARCHAR, project_name VARCHAR, section_id VARCHAR, '
+                'section_name VARCHAR, notification_user_id BIGINT NOT NULL, toggle_stickers BOOLEAN NOT NULL)'))
+            connection.execute(text(
+                "INSERT INTO \"Users\" (tg_id, tg_first_name, asana_id) VALUES (1, 'Ann', 'a1')"))
+            connection.execute(text(
+                "INSERT INTO \"DefaultSettings\" (chat_id, workspace_id, workspace_name, notification_user_id, "
+                "toggle_stickers) VALUES (-1, 'w1', 'Workspace', 1, 1)"))
+
+    def test_fresh_database(self):
+        self.assertEqual(migrate(self.engine), [version for version, _, _ in MIGRATIONS])
+        tables = set(inspect(self.engine).get_table_names())
+        self.assertTrue({'Users', 'DefaultSettings', 'DueTodayTasks', 'DueTodayProjects', 'JobRuns'} <= tables)
+        self.assertEqual(migrate(self.engine), [])
+        self.assertEqual(pending_migrations(self.engine), [])
+
+    def test_first_version_is_frozen(self):
+        migrate(self.engine, target=1)
+        columns = {column['name'] for column in inspect(self.engine).get_columns('Users')}
+        self.assertEqual(columns, {'tg_id', 'tg_first_name', 'tg_username', 'asana_token', 'asana_refresh_token',
+                                   'asana_id'})
+        self.assertEqual(inspect(self.engine).get_indexes('Users'), [])
+
+    def test_migrated_schema_matches_models(self):
+        # Зміна моделі без нової міграції
+        migrate(self.engine)
+        inspector = inspect(self.engine)
+        with self.engine.connect() as connection:
+            # Індекси за виразами SQLite не віддає через inspect
+            indexes = {row[0] for row in connection.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"))}
+        for name, model_table in Base.metadata.tables.items():
+            columns = {column['name'] for column in inspector.get_columns(name)}
+            self.assertEqual(columns, set(model_table.columns.keys()), name)
+            self.assertTrue({index.name for index in model_table.indexes} <= indexes, name)
+
+    def test_existing_rows_get_defaults(self):
+        self.create_baseline()
+        migrate(self.engine)
+
+        with Session(self.engine) as session:
+            self.assertFalse(session.get(Users, 1).notify_empty)
+            settings = session.get(DefaultSettings, -1)
+            self.assertEqual(settings.digest_time, DefaultSettings.digest_time.default.arg)
+            self.assertEqual(settings.timezone, DefaultSettings.timezone.default.arg)
+        with self.engine.connect() as connection:
+            indexes = {row[0] for row in connection.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'Users'"))}
+        self.assertTrue({'ix_Users_tg_username_lower', 'ix_Users_asana_id'} <= indexes)
+
+    def test_target_version(self):
+        self.create_baseline()
+        self.assertEqual(migrate(self.engine, target=2), [1, 2])
+        self.assertEqual(current_version(self.engine), 2)
+        columns = {column['name'] for column in inspect(self.engine).get_columns('DefaultSettings')}
+        self.assertNotIn('digest_time', columns)
+
+    def test_plaintext_tokens_are_encrypted(self):
+        self.create_baseline()
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO \"Users\" (tg_id, tg_first_name, asana_token, asana_refresh_token, asana_id) "
+                "VALUES (2, 'Bob', 'access', 'refresh', 'a2')"))
+        migrate(self.engine)
+
+        with self.engine.connect() as connection:
+            stored = connection.execute(text(
+                'SELECT asana_token, asana_refresh_token FROM "Users" WHERE tg_id = 2')).one()
+        self.assertTrue(all(value.startswith(token_vault.SEALED_PREFIX) for value in stored))
+        with Session(self.engine) as session:
+            user = session.get(Users, 2)
+            self.assertEqual((user.asana_token, user.asana_refresh_token), ('access', 'refresh'))
+            self.assertIsNone(session.get(Users, 1).asana_token)
+
+    def test_token_encryption_requires_vault_key(self):
+        self.create_baseline()
+        migrate(self.engine, target=7)
+        with patch.object(token_vault, 'key', None), self.assertRaises(RuntimeError):
+            migrate(self.engine)
+        self.assertEqual(current_version(self.engine), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import asyncio
+import datetime
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from db.user_index import UserIndex
+from utils import notifications
+from utils.task_snapshot import ProjectTaskSnapshot
+
+
+class TestDailyNotification(unittest.IsolatedAsyncioTestCase):
+
+    async def test_one_digest_per_user(self):
+        today = datetime.date.today().isoformat()
+        snapshots = {'p1': ProjectTaskSnapshot('p1'), 'p2': ProjectTaskSnapshot('p2')}
+        snapshots['p1'].put({'gid': '1', 'name': 'Due', 'assignee': {'gid': 'a1'}, 'due_on': today})
+        snapshots['p1'].put({'gid': '2', 'name': 'Later', 'assignee': {'gid': 'a1'}, 'due_on': '2000-01-01'})
+        snapshots['p1'].put({'gid': '3', 'name': 'Guest', 'assignee': {'gid': 'guest'}, 'due_on': today})
+        snapshots['p2'].put({'gid': '4', 'name': 'Other', 'assignee': {'gid': 'a1'}, 'due_on': today})
+        chats = [SimpleNamespace(chat_id=-1, project_id='p1', project_name='One', notification_user_id=1),
+                 SimpleNamespace(chat_id=-1, project_id='p1', project_name='One', notification_user_id=2),
+                 SimpleNamespace(chat_id=-1, project_id='p2', project_name='Two', notification_user_id=1)]
+        fetches = []
+
+        async def load_users(index):
+            notifications.user_index.put(10, 'a1')
+            notifications.user_index.put(20, 'a2')
+            notifications.user_index.put(30, 'a3')
+            notifications.user_index.set_notify_empty(30, True)
+
+        async def get_snapshot(project_id, asana_client):
+            fetches.append(project_id)
+            await asyncio.sleep(0)
+            return snapshots[project_id]
+
+        settings = mock.AsyncMock(return_value=chats)
+        with mock.patch.object(notifications, 'get_default_settings_for_notification', settings), \
+                mock.patch.object(notifications, 'user_index', UserIndex()), \
+                mock.patch.object(UserIndex, 'load', load_users), \
+                mock.patch.object(notifications, 'get_asana_client', mock.AsyncMock(return_value=object())), \
+                mock.patch.object(notifications.task_snapshots, 'get', get_snapshot), \
+                mock.patch.object(notifications, 'digest_spread', 0), \
+                mock.patch.object(notifications, 'cached_due_tasks', mock.AsyncMock(return_value=None)), \
+                mock.patch.object(notifications, 'bot') as bot:
+            bot.send_message = mock.AsyncMock()
+            await notifications.daily_notification()
+
+        self.assertEqual(sorted(fetches), ['p1', 'p2'])
+        sent = sorted(call.args for call in bot.send_message.await_args_list)
+        self.assertEqual(sent, [
+            (10, "У вас є завдання на сьогодні:\n\n📁 One\n🔸 Due\n\n📁 Two\n🔸 Other"),
+            (30, "На сьогодні задач немає."),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
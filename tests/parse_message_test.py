@@ -28,6 +28,40 @@ class TestHandlers(unittest.TestCase):
         }
         self.assertEqual(parse_message_complete(text), expected_output)
 
+    def test_parse_message_command_notify(self):
+        text = "/asana notify"
+        expected_output = {
+            "task_name": "Untitled Task",
+            "description": "",
+            "date": None,
+            "assignees": [],
+            "command": "notify"
+        }
+        self.assertEqual(parse_message_complete(text), expected_output)
+
+    def test_parse_message_title_starting_with_notify(self):
+        text = "/asana notify customers about the outage @bob"
+        expected_output = {
+            "task_name": "notify customers about the outage",
+            "description": "",
+            "date": None,
+            "assignees": ["bob"],
+            "command": None
+        }
+        self.assertEqual(parse_message_complete(text), expected_output)
+
+    def test_parse_message_title_starting_with_digest(self):
+        text = "/asana digestion report"
+        expected_output = {
+            "task_name": "digestion report",
+            "description": "",
+            "date": None,
+            "assignees": [],
+            "command": None
+        }
+        self.assertEqual(parse_message_complete(text), expected_output)
+        self.assertEqual(parse_message_complete("/asana digest 09:00")["command"], "digest")
+
     def test_parse_message_with_date_and_assignees(self):
         text = "/asana Назва @f до 10.11.2024 @quasarex @q\nОпис"
         expected_output = {
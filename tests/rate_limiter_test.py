@@ -0,0 +1,91 @@
+import time
+import unittest
+
+from utils.asana_client import AsanaError
+from utils.rate_limiter import AsanaRateLimiter, TokenBucket
+
+
+class TestTokenBucket(unittest.IsolatedAsyncioTestCase):
+
+    async def test_waits_for_refill(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+        await bucket.acquire()
+        started = time.monotonic()
+        await bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.005)
+
+    async def test_cost_takes_several_tokens(self):
+        bucket = TokenBucket(rate=100, capacity=10)
+        await bucket.acquire(10)
+        self.assertLessEqual(bucket.available(), 0.5)
+        started = time.monotonic()
+        await bucket.acquire(5)
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+
+
+class TestAsanaRateLimiter(unittest.IsolatedAsyncioTestCase):
+
+    def limiter(self):
+        return AsanaRateLimiter(rate_per_minute=6000, burst=10, max_retries=3, backoff_base=0.001)
+
+    async def test_honors_retry_after(self):
+        limiter = self.limiter()
+        responses = [AsanaError(429, 'Too Many Requests', {'Retry-After': '0.05'}), {'data': 'ok'}]
+
+        async def send():
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        started = time.monotonic()
+        self.assertEqual(await limiter.run('token', 'GET', send), {'data': 'ok'})
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        stats = next(iter(limiter.stats().values()))
+        self.assertEqual((stats['requests'], stats['throttled'], stats['retries']), (2, 1, 1))
+
+    async def test_retries_server_errors_except_post(self):
+        limiter = self.limiter()
+        calls = []
+
+        async def send():
+            calls.append(1)
+            raise AsanaError(503, 'Service Unavailable')
+
+        with self.assertRaises(AsanaError):
+            await limiter.run('token', 'GET', send)
+        self.assertEqual(len(calls), 4)
+
+        calls.clear()
+        with self.assertRaises(AsanaError):
+            await limiter.run('token', 'POST', send)
+        self.assertEqual(len(calls), 1)
+
+    async def test_client_errors_are_not_retried(self):
+        limiter = self.limiter()
+        calls = []
+
+        async def send():
+            calls.append(1)
+            raise AsanaError(400, 'Bad Request')
+
+        with self.assertRaises(AsanaError):
+            await limiter.run('token', 'PUT', send)
+        self.assertEqual(len(calls), 1)
+
+    async def test_stats_do_not_keep_idle_tokens_alive(self):
+        limiter = self.limiter()
+
+        async def send():
+            return 'ok'
+
+        limiter._tokens.ttl = 0.01
+        await limiter.run('token', 'GET', send)
+        self.assertEqual(len(limiter.stats()), 1)
+        time.sleep(0.02)
+        limiter.stats()
+        self.assertEqual(limiter.evict_idle(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import asyncio
+import time
+import unittest
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from bot.send_queue import TelegramSendQueue, INTERACTIVE, BULK
+
+
+class TestTelegramSendQueue(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.queue = TelegramSendQueue(global_rate=1000, chat_rate=1000, chat_burst=1000, workers=1)
+        self.sent = []
+
+    async def asyncTearDown(self):
+        await self.queue.close()
+
+    def sender(self, name):
+        async def send():
+            self.sent.append(name)
+            return name
+        return send
+
+    async def test_interactive_goes_before_bulk(self):
+        self.queue.start()
+        gate = asyncio.Event()
+
+        async def blocking_send():
+            await gate.wait()
+            self.sent.append('first')
+
+        # Поки воркер зайнятий першим повідомленням, в черзі накопичуються інші
+        first = asyncio.ensure_future(self.queue.submit(1, blocking_send, BULK))
+        await asyncio.sleep(0.01)
+        bulk = [asyncio.ensure_future(self.queue.submit(i, self.sender(f'bulk{i}'), BULK)) for i in range(2, 4)]
+        reply = asyncio.ensure_future(self.queue.submit(9, self.sender('reply'), INTERACTIVE))
+        await asyncio.sleep(0.01)
+        gate.set()
+        await asyncio.gather(first, reply, *bulk)
+
+        self.assertEqual(self.sent, ['first', 'reply', 'bulk2', 'bulk3'])
+        self.assertEqual(self.queue.stats()['sent'], 4)
+
+    async def test_retry_after_is_retried(self):
+        self.queue.start()
+        attempts = []
+
+        async def send():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise TelegramRetryAfter(SendMessage(chat_id=1, text='x'), 'Too Many Requests', 0)
+            return 'ok'
+
+        self.assertEqual(await self.queue.submit(1, send), 'ok')
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(self.queue.stats()['retries'], 1)
+
+    async def test_throttled_group_does_not_hold_workers(self):
+        self.queue = TelegramSendQueue(global_rate=1000, chat_rate=1000, group_rate_per_minute=60, chat_burst=1,
+                                       workers=2)
+        self.queue.start()
+        started = time.monotonic()
+        group = [asyncio.ensure_future(self.queue.submit(-1, self.sender(f'group{i}'), BULK)) for i in range(3)]
+        await asyncio.sleep(0)
+        await self.queue.submit(1, self.sender('private'), INTERACTIVE)
+
+        # Група шле не частіше разу на секунду, але особисте повідомлення не чекає за нею
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(sorted(self.sent), ['group0', 'private'])
+        for task in group:
+            task.cancel()
+        await asyncio.gather(*group, return_exceptions=True)
+
+    async def test_sends_directly_when_not_started(self):
+        self.assertEqual(await self.queue.submit(1, self.sender('direct')), 'direct')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from utils import task_queries
+from utils.asana_client import AsanaError
+from utils.task_queries import find_user_tasks
+
+
+def task(gid, project='p', due_on=None):
+    return {'gid': gid, 'name': f'Задача {gid}', 'assignee': {'gid': 'u'}, 'due_on': due_on,
+            'projects': [{'gid': project}], 'created_at': '2024-01-01T00:00:00Z'}
+
+
+class FakeAsanaClient:
+    def __init__(self, search_status=None):
+        self.search_status = search_status
+        self.calls = []
+
+    async def get(self, path, params=None):
+        self.calls.append((path, dict(params or {})))
+        if path.endswith('/tasks/search'):
+            if self.search_status:
+                raise AsanaError(self.search_status, 'Payment Required')
+            return [task('1', due_on=params.get('due_on'))]
+        if path.endswith('/user_task_list'):
+            return {'gid': 'utl'}
+        raise AssertionError(path)
+
+    async def collect(self, path, params=None):
+        self.calls.append((path, dict(params or {})))
+        return [task('1', due_on='2024-11-10'), task('2', project='other'), task('3')]
+
+
+class TestFindUserTasks(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        task_queries._search_unavailable.clear()
+        task_queries._user_task_lists.clear()
+
+    async def test_filters_are_sent_to_search(self):
+        client = FakeAsanaClient()
+        tasks = await find_user_tasks(client, 'w', 'u', 'p', '2024-11-10')
+
+        self.assertEqual(tasks, {'1': {'name': 'Задача 1', 'assignee_gid': 'u'}})
+        path, params = client.calls[0]
+        self.assertEqual(path, '/workspaces/w/tasks/search')
+        self.assertEqual(params['assignee.any'], 'u')
+        self.assertEqual(params['projects.any'], 'p')
+        self.assertEqual(params['due_on'], '2024-11-10')
+        self.assertIs(params['completed'], False)
+
+    async def test_falls_back_to_user_task_list(self):
+        client = FakeAsanaClient(search_status=402)
+        tasks = await find_user_tasks(client, 'w', 'u', 'p')
+        self.assertEqual(list(tasks), ['1', '3'])
+
+        # Недоступність пошуку запам'ятовується
+        client.calls.clear()
+        await find_user_tasks(client, 'w', 'u', None, '2024-11-10')
+        self.assertEqual([path for path, _ in client.calls], ['/user_task_lists/utl/tasks'])
+
+
+if __name__ == "__main__":
+    unittest.main()
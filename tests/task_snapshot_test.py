@@ -0,0 +1,95 @@
+import unittest
+
+from utils.asana_client import AsanaError
+from utils.task_snapshot import TaskSnapshotStore
+
+
+class FakeAsanaClient:
+    def __init__(self):
+        self.tasks = {
+            '1': {'gid': '1', 'name': 'Перша', 'assignee': {'gid': 'u1'}, 'due_on': '2024-11-10',
+                  'completed': False, 'projects': [{'gid': 'p'}]},
+            '2': {'gid': '2', 'name': 'Друга', 'assignee': {'gid': 'u2'}, 'due_on': None,
+                  'completed': False, 'projects': [{'gid': 'p'}]},
+        }
+        self.events = []
+        self.scans = 0
+        # Номер задачі, на якій iterate обривається (імітація збою сторінки)
+        self.fail_at = None
+
+    async def request(self, method, path, params=None, data=None):
+        if 'sync' not in params:
+            raise AsanaError(412, 'Sync token invalid', body={'sync': 's0'})
+        events, self.events = self.events, []
+        return {'data': events, 'sync': 's1', 'has_more': False}
+
+    async def iterate(self, path, params=None):
+        self.scans += 1
+        for index, task in enumerate(list(self.tasks.values())):
+            if index == self.fail_at:
+                raise AsanaError(503, 'Service unavailable')
+            yield task
+
+    async def get(self, path, params=None):
+        gid = path.rsplit('/', 1)[1]
+        if gid not in self.tasks:
+            raise AsanaError(404, 'Not found')
+        return self.tasks[gid]
+
+
+def task_event(gid, action='changed'):
+    return {'action': action, 'resource': {'gid': gid, 'resource_type': 'task'}}
+
+
+class TestTaskSnapshotStore(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.client = FakeAsanaClient()
+        self.store = TaskSnapshotStore(sync_interval=0)
+
+    async def test_bootstrap_indexes_by_assignee(self):
+        snapshot = await self.store.get('p', self.client)
+        self.assertEqual(snapshot.sync_token, 's0')
+        self.assertEqual(list(snapshot.tasks_for('u1')), ['1'])
+        self.assertEqual(list(snapshot.tasks_for('u1', '2024-11-10')), ['1'])
+        self.assertEqual(snapshot.tasks_for('u1', '2024-11-11'), {})
+
+    async def test_events_are_applied_incrementally(self):
+        await self.store.get('p', self.client)
+        self.client.tasks['2']['assignee'] = {'gid': 'u1'}
+        self.client.tasks['1']['completed'] = True
+        self.client.tasks['3'] = {'gid': '3', 'name': 'Третя', 'assignee': {'gid': 'u2'}, 'due_on': None,
+                                  'completed': False, 'projects': [{'gid': 'p'}]}
+        self.client.events = [task_event('1'), task_event('2'), task_event('3', 'added')]
+
+        snapshot = await self.store.get('p', self.client)
+
+        self.assertEqual(self.client.scans, 1)
+        self.assertEqual(snapshot.sync_token, 's1')
+        self.assertEqual(list(snapshot.tasks_for('u1')), ['2'])
+        self.assertEqual(list(snapshot.tasks_for('u2')), ['3'])
+
+    async def test_deleted_task_is_dropped(self):
+        await self.store.get('p', self.client)
+        del self.client.tasks['1']
+        self.client.events = [task_event('1', 'deleted')]
+
+        snapshot = await self.store.get('p', self.client)
+
+        self.assertEqual(snapshot.tasks_for('u1'), {})
+
+    async def test_failed_bootstrap_is_not_kept(self):
+        self.client.fail_at = 1
+        with self.assertRaises(AsanaError):
+            await self.store.get('p', self.client)
+        self.assertFalse(self.store.is_warm('p'))
+
+        self.client.fail_at = None
+        snapshot = await self.store.get('p', self.client)
+
+        self.assertEqual(sorted(snapshot.tasks), ['1', '2'])
+        self.assertEqual(self.client.scans, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import asyncio
+import unittest
+
+from utils.token_refresh import TokenRefreshCoordinator
+
+
+class TestTokenRefreshCoordinator(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_callers_share_one_refresh(self):
+        calls = []
+
+        async def refresh(tg_id, failed_token):
+            calls.append((tg_id, failed_token))
+            await asyncio.sleep(0.01)
+            return "new"
+
+        coordinator = TokenRefreshCoordinator(refresh)
+        results = await asyncio.gather(*[coordinator.refresh(1, "old") for _ in range(5)])
+
+        self.assertEqual(calls, [(1, "old")])
+        self.assertEqual(results, ["new"] * 5)
+        await asyncio.sleep(0)
+        self.assertEqual(coordinator.in_flight(), 0)
+
+    async def test_failure_is_propagated_and_not_cached(self):
+        attempts = []
+
+        async def refresh(tg_id, failed_token):
+            attempts.append(tg_id)
+            if len(attempts) == 1:
+                raise RuntimeError("boom")
+            return "new"
+
+        coordinator = TokenRefreshCoordinator(refresh)
+        with self.assertRaises(RuntimeError):
+            await coordinator.refresh(1)
+        await asyncio.sleep(0)
+        self.assertEqual(await coordinator.refresh(1), "new")
+
+
+if __name__ == "__main__":
+    unittest.main()
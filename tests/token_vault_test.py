@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import patch
+
+from utils import token_vault as token_vault_module
+from utils.token_encryption import generate_key
+from utils.config import key as handoff_key
+from utils.token_vault import TokenVault
+
+
+class TestTokenVault(unittest.TestCase):
+
+    def setUp(self):
+        self.vault = TokenVault(key=generate_key(), cache_ttl=60, cache_size=10)
+
+    def test_seal_and_open(self):
+        sealed = self.vault.seal('token')
+        self.assertTrue(self.vault.is_sealed(sealed))
+        self.assertNotIn('token', sealed)
+        self.assertEqual(self.vault.seal(sealed), sealed)
+        self.assertNotEqual(self.vault.seal('token'), sealed)
+        self.assertEqual(self.vault.open(sealed), 'token')
+        self.assertIsNone(self.vault.seal(None))
+        self.assertIsNone(self.vault.open(None))
+
+    def test_plaintext_is_returned_as_is(self):
+        self.assertEqual(self.vault.open('legacy'), 'legacy')
+
+    def test_open_decrypts_once(self):
+        sealed = self.vault.seal('token')
+        self.vault.clear()
+        with patch.object(token_vault_module, 'decrypt_token', wraps=token_vault_module.decrypt_token) as decrypt:
+            self.assertEqual(self.vault.open(sealed), 'token')
+            self.assertEqual(self.vault.open(sealed), 'token')
+        self.assertEqual(decrypt.call_count, 1)
+        self.assertEqual(self.vault.stats(), {'size': 1, 'hits': 1, 'misses': 1})
+
+    def test_wrong_key(self):
+        sealed = self.vault.seal('token')
+        other = TokenVault(key=generate_key())
+        with self.assertLogs(level='WARNING'):
+            self.assertIsNone(other.open(sealed))
+
+    def test_requires_own_key(self):
+        for key in (None, handoff_key):
+            with self.assertRaises(RuntimeError):
+                TokenVault(key=key).seal('token')
+        self.assertEqual(TokenVault(key=None).open('legacy'), 'legacy')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import time
+import unittest
+
+from utils.ttl_cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_get_and_set(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertIn("a", cache)
+
+    def test_lru_eviction_calls_on_evict(self):
+        evicted = []
+        cache = TTLCache(maxsize=2, ttl=60, on_evict=evicted.append)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(evicted, [2])
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+
+    def test_ttl_expiry(self):
+        evicted = []
+        cache = TTLCache(maxsize=10, ttl=0.01, on_evict=evicted.append)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        self.assertEqual(cache.expire(), 1)
+        self.assertEqual(evicted, [1])
+        self.assertEqual(len(cache), 0)
+
+    def test_items_do_not_extend_ttl(self):
+        cache = TTLCache(maxsize=10, ttl=0.05)
+        cache.set("a", 1)
+        time.sleep(0.03)
+        self.assertEqual(cache.items(), [("a", 1)])
+        time.sleep(0.03)
+        self.assertEqual(cache.items(), [])
+        self.assertEqual(cache.expire(), 1)
+
+    def test_invalidate_and_clear(self):
+        evicted = []
+        cache = TTLCache(maxsize=10, ttl=60, on_evict=evicted.append)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertTrue(cache.invalidate("a"))
+        self.assertFalse(cache.invalidate("a"))
+        cache.clear()
+        self.assertEqual(evicted, [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from db.user_index import UserIndex
+
+
+class TestUserIndex(unittest.TestCase):
+
+    def test_put_replaces_previous_asana_id(self):
+        index = UserIndex()
+        index.put(1, 'a1')
+        index.put(1, 'a2')
+        self.assertIsNone(index.tg_id('a1'))
+        self.assertEqual(index.tg_id('a2'), 1)
+        self.assertEqual(index._asana_ids, {1: 'a2'})
+
+    def test_remove(self):
+        index = UserIndex()
+        index.put(1, 'a1')
+        index.put(2, None)
+        index.remove(1)
+        self.assertIsNone(index.tg_id('a1'))
+        self.assertEqual(index._asana_ids, {2: None})
+
+    def test_unknown_assignee(self):
+        self.assertIsNone(UserIndex().tg_id('missing'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import asyncio
+
+from utils.asana_client import AsanaClient, AsanaError, _error_message
+from utils.config import asana_batch_window
+
+# Максимальна кількість дій в одному запиті до /batch
+batch_size = 10
+
+
+def batch_action(method: str, path: str, data: dict | None = None, fields: str | None = None) -> dict:
+    action = {'method': method.lower(), 'relative_path': path}
+    if data is not None:
+        action['data'] = data
+    if fields:
+        action['options'] = {'fields': fields.split(',')}
+    return action
+
+
+# Виконує дії через Asana Batch API: до 10 незалежних дій за один запит.
+# execute() повертає результат або AsanaError для кожної дії окремо.
+# call() збирає поодинокі дії одночасних викликів з тим самим токеном і відправляє їх одним пакетом.
+class AsanaBatchExecutor:
+    def __init__(self, window: float = asana_batch_window):
+        self.window = window
+        self._pending: dict[str, list] = {}
+        self._flushers: dict[str, asyncio.TimerHandle] = {}
+        self._deliveries = set()
+
+    async def execute(self, asana_client: AsanaClient, actions: list[dict]) -> list:
+        if len(actions) == 1:
+            # Одна дія - звичайний запит, без накладних витрат пакета
+            return [await self._send_one(asana_client, actions[0])]
+        chunks = [actions[i:i + batch_size] for i in range(0, len(actions), batch_size)]
+        responses = await asyncio.gather(*[self._send(asana_client, chunk) for chunk in chunks],
+                                         return_exceptions=True)
+        results = []
+        for chunk, response in zip(chunks, responses):
+            if isinstance(response, BaseException):
+                # Пакет не пройшов цілком - помилка належить кожній його дії
+                error = response if isinstance(response, AsanaError) else AsanaError(None, str(response))
+                results.extend([error] * len(chunk))
+            else:
+                results.extend(response)
+        return results
+
+    async def call(self, asana_client: AsanaClient, method: str, path: str, data: dict | None = None,
+                   fields: str | None = None):
+        future = asyncio.get_running_loop().create_future()
+        key = asana_client.access_token
+        queue = self._pending.setdefault(key, [])
+        queue.append((asana_client, batch_action(method, path, data, fields), future))
+        if len(queue) >= batch_size:
+            self._flush(key)
+        elif key not in self._flushers:
+            self._flushers[key] = asyncio.get_running_loop().call_later(self.window, self._flush, key)
+
+        result = await future
+        if isinstance(result, AsanaError):
+            raise result
+        return result
+
+    def _flush(self, key: str):
+        handle = self._flushers.pop(key, None)
+        if handle is not None:
+            handle.cancel()
+        queue = self._pending.pop(key, None)
+        if not queue:
+            return
+        delivery = asyncio.ensure_future(self._deliver(queue))
+        self._deliveries.add(delivery)
+        delivery.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, queue: list):
+        try:
+            results = await self.execute(queue[0][0], [action for _, action, _ in queue])
+        except Exception as e:
+            results = [e] * len(queue)
+        for (_, _, future), result in zip(queue, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception) and not isinstance(result, AsanaError):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    @staticmethod
+    async def _send(asana_client: AsanaClient, actions: list[dict]) -> list:
+        # Asana рахує в ліміт кожну дію batch, а не сам запит
+        responses = await asana_client.post('/batch', {'actions': actions}, cost=len(actions))
+        results = []
+        for response in responses:
+            body = response.get('body') or {}
+            if response.get('status_code', 500) >= 400:
+                results.append(AsanaError(response.get('status_code'), _error_message(body, 'Batch action failed'),
+                                          response.get('headers'), body))
+            else:
+                results.append(body.get('data'))
+        return results
+
+    @staticmethod
+    async def _send_one(asana_client: AsanaClient, action: dict):
+        params = {'opt_fields': ','.join(action['options']['fields'])} if 'options' in action else None
+        try:
+            body = await asana_client.request(action['method'].upper(), action['relative_path'], params=params,
+                                              data=action.get('data'))
+            return body.get('data')
+        except AsanaError as e:
+            return e
+
+
+asana_batch = AsanaBatchExecutor()
@@ -0,0 +1,138 @@
+import asyncio
+
+import aiohttp
+
+from utils import job_report
+from utils.config import url, asana_request_timeout, asana_connection_limit
+from utils.rate_limiter import rate_limiter
+
+api_url = url + 'api/1.0'
+
+# Спільна для всіх користувачів сесія: один пул keep-alive з'єднань до app.asana.com
+_session: aiohttp.ClientSession | None = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(limit=asana_connection_limit, keepalive_timeout=60)
+        _session = aiohttp.ClientSession(connector=connector)
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+class AsanaError(Exception):
+    def __init__(self, status: int | None, message: str, headers=None, body=None):
+        super().__init__(f"{status}: {message}" if status else message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+        self.body = body
+
+
+# Асинхронний клієнт Asana REST API.
+# Токен вважається дійсним, доки Asana не відповість 401; тоді refresher оновлює його один раз і запит повторюється.
+class AsanaClient:
+    def __init__(self, access_token: str, refresher=None):
+        self.access_token = access_token
+        self.refresher = refresher
+
+    # cost - скільки запитів рахує Asana (для /batch - кількість дій)
+    async def request(self, method: str, path: str, params: dict | None = None, data=None,
+                      timeout: float | None = None, cost: int = 1) -> dict:
+        failed_token = self.access_token
+        try:
+            return await self._schedule(method, path, params, data, timeout, cost)
+        except AsanaError as e:
+            if e.status != 401 or self.refresher is None:
+                raise
+            access_token = await self.refresher(failed_token)
+            if not access_token:
+                raise
+            self.access_token = access_token
+            return await self._schedule(method, path, params, data, timeout, cost)
+
+    async def get(self, path: str, params: dict | None = None, **kwargs):
+        return (await self.request('GET', path, params=params, **kwargs)).get('data')
+
+    async def post(self, path: str, data, params: dict | None = None, **kwargs):
+        return (await self.request('POST', path, params=params, data=data, **kwargs)).get('data')
+
+    async def put(self, path: str, data, params: dict | None = None, **kwargs):
+        return (await self.request('PUT', path, params=params, data=data, **kwargs)).get('data')
+
+    async def delete(self, path: str, **kwargs):
+        return (await self.request('DELETE', path, **kwargs)).get('data')
+
+    async def iterate(self, path: str, params: dict | None = None, page_size: int = 100):
+        # Пагінація Asana через offset, сторінки завантажуються по мірі ітерації
+        params = dict(params or {})
+        params.setdefault('limit', page_size)
+        while True:
+            body = await self.request('GET', path, params=params)
+            for item in body.get('data') or []:
+                yield item
+            next_page = body.get('next_page')
+            if not next_page:
+                return
+            params['offset'] = next_page['offset']
+
+    async def collect(self, path: str, params: dict | None = None) -> list:
+        return [item async for item in self.iterate(path, params)]
+
+    async def _schedule(self, method, path, params, data, timeout, cost) -> dict:
+        # Усі запити проходять через ліміти токена; 429 та 5xx повторюються там же
+        access_token = self.access_token
+        return await rate_limiter.run(access_token, method,
+                                      lambda: self._send(access_token, method, path, params, data, timeout), cost)
+
+    async def _send(self, access_token, method, path, params, data, timeout) -> dict:
+        job_report.count('asana_calls')
+        headers = {
+            'Authorization': f'Bearer {access_token}',
+            'Accept': 'application/json',
+        }
+        json_body = {'data': data} if data is not None else None
+        client_timeout = aiohttp.ClientTimeout(total=timeout or asana_request_timeout)
+
+        try:
+            async with get_session().request(method, api_url + path, params=_prepare_params(params),
+                                             json=json_body, headers=headers, timeout=client_timeout) as response:
+                try:
+                    body = await response.json(content_type=None)
+                except ValueError:
+                    body = None
+                if response.status >= 400:
+                    raise AsanaError(response.status, _error_message(body, response.reason), response.headers, body)
+                return body or {}
+        except asyncio.TimeoutError:
+            raise AsanaError(None, f"Timed out: {method} {path}")
+        except aiohttp.ClientError as e:
+            raise AsanaError(None, f"{method} {path}: {e}")
+
+
+def _prepare_params(params: dict | None) -> dict | None:
+    if not params:
+        return None
+    prepared = {}
+    for name, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = 'true' if value else 'false'
+        elif isinstance(value, (list, tuple, set)):
+            value = ','.join(str(item) for item in value)
+        prepared[name] = value if isinstance(value, str) else str(value)
+    return prepared
+
+
+def _error_message(body, default: str) -> str:
+    if isinstance(body, dict) and body.get('errors'):
+        return body['errors'][0].get('message', default)
+    return default
@@ -1,74 +1,71 @@
 import logging
 
-import asana
 import requests
-from asana.rest import ApiException
 
 from db.functions import *
+from db.session import session_scope
+from utils import job_report
+from utils.asana_client import AsanaClient, AsanaError
+from utils.client_pool import client_pool
 from utils.config import *
+from utils.executor import run_blocking
+from utils.token_refresh import TokenRefreshCoordinator
 
 
-def get_asana_id(asana_token):
-    asana_id = 0
-    headers = {
-        'Authorization': 'Bearer ' + asana_token
-    }
-    response = requests.get(url + 'api/1.0/users/me', headers=headers)
-    if response.ok:
-        user_data = response.json()
-        asana_id = user_data['data']['gid']
-    else:
-        logging.debug("Error:", response.text)
-    return asana_id
+async def get_asana_id(asana_token):
+    user_data = await AsanaClient(asana_token).get('/users/me', {'opt_fields': 'gid'})
+    return user_data['gid']
+
+
+async def get_asana_client(user_id, token=None):
+    if token:
+        # Token supplied during authorization: the user may not be stored yet and there is nothing to refresh with
+        return client_pool.get(user_id, token)
+
+    return asana_client_for(await get_user(user_id))
 
 
-def get_asana_client(user_id, token=None):
-    user = get_user(user_id)
-    if not user:
+# Клієнт для вже завантаженого рядка користувача (bot.middlewares.RequestContextMiddleware)
+def asana_client_for(user) -> AsanaClient | None:
+    if not user or not user.asana_token:
         return None
 
-    if token:
-        access_token = token
-    else:
-        access_token = user.asana_token
-
-    # Initialize the Asana client with the access token
-    configuration = asana.Configuration()
-    configuration.access_token = access_token
-    asana_client = asana.ApiClient(configuration)
-
-    try:
-        # Make a lightweight API call to verify the token
-        users_api_instance = asana.UsersApi(asana_client)
-        users_api_instance.get_user("me", opts={})
-        return asana_client  # Token is valid, return the client
-    except asana.rest.ApiException as e:
-        if e.status == 401 and not token:  # Unauthorized, token may be expired or revoked
-            try:
-                # Attempt to refresh the token
-                new_access_token, new_refresh_token = refresh_access_token(user.asana_refresh_token)
-
-                # Update the user's token in the database
-                create_user(
-                    tg_id=user_id,
-                    tg_first_name=user.tg_first_name,
-                    tg_username=user.tg_username,
-                    asana_token=new_access_token,
-                    asana_refresh_token=new_refresh_token,
-                    asana_id=user.asana_id
-                )
-
-                # Reinitialize the Asana client with the new token
-                configuration.access_token = new_access_token
-                asana_client = asana.ApiClient(configuration)
-
-                # Test the new token with a lightweight API call
-                asana.UsersApi(asana_client).get_user('me', opts={})
-                return asana_client  # New token is valid
-            except Exception:
-                raise Exception(f"Failed to refresh token: {Exception}")
-        else:
-            raise e
+    # The token is trusted until Asana answers 401; the client then refreshes once and replays the request
+    user_id = user.tg_id
+    return client_pool.get(user_id, user.asana_token,
+                           refresher=lambda failed_token: token_refresher.refresh(user_id, failed_token))
+
+
+async def refresh_user_token(user_id, failed_token=None):
+    # Оновлення може чекати кілька оновлень Telegram, тож воно працює у власній сесії
+    async with session_scope():
+        user = await get_user(user_id, fresh=True)
+        if not user or not user.asana_refresh_token:
+            return None
+
+        # Someone has already refreshed the token that failed; reuse the stored pair instead of rotating it again
+        if failed_token and user.asana_token and user.asana_token != failed_token:
+            return user.asana_token
+
+        new_access_token, new_refresh_token = await run_blocking(refresh_access_token, user.asana_refresh_token,
+                                                                 user_id=user_id)
+        job_report.count('token_refreshes')
+
+        # Update the user's token in the database
+        await create_user(
+            tg_id=user_id,
+            tg_first_name=user.tg_first_name,
+            tg_username=user.tg_username,
+            asana_token=new_access_token,
+            asana_refresh_token=new_refresh_token,
+            asana_id=user.asana_id
+        )
+    client_pool.update_token(user_id, new_access_token)
+    return new_access_token
+
+
+# Спільний для хендлерів і планувальника
+token_refresher = TokenRefreshCoordinator(refresh_user_token)
 
 
 def refresh_access_token(refresh_token):
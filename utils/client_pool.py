@@ -0,0 +1,42 @@
+from utils.asana_client import AsanaClient, close_session
+from utils.config import asana_client_pool_size, asana_client_idle_ttl
+from utils.ttl_cache import TTLCache
+
+
+# Пул довгоживучих Asana клієнтів за Telegram id.
+# Усі клієнти ділять одну aiohttp сесію, тож TLS з'єднання з app.asana.com перевикористовуються.
+class AsanaClientPool:
+    def __init__(self, maxsize: int = asana_client_pool_size, idle_ttl: float = asana_client_idle_ttl):
+        self._clients = TTLCache(maxsize=maxsize, ttl=idle_ttl)
+
+    def get(self, tg_id: int, access_token: str, refresher=None) -> AsanaClient:
+        asana_client = self._clients.get(tg_id)
+        if asana_client is None:
+            asana_client = AsanaClient(access_token)
+            self._clients.set(tg_id, asana_client)
+        elif asana_client.access_token != access_token:
+            asana_client.access_token = access_token
+        asana_client.refresher = refresher
+        return asana_client
+
+    def update_token(self, tg_id: int, access_token: str):
+        # Токен підставляється в заголовок на кожен запит, тому достатньо замінити його в клієнті
+        asana_client = self._clients.get(tg_id)
+        if asana_client is not None:
+            asana_client.access_token = access_token
+
+    def discard(self, tg_id: int):
+        self._clients.invalidate(tg_id)
+
+    def evict_idle(self) -> int:
+        return self._clients.expire()
+
+    async def close(self):
+        self._clients.clear()
+        await close_session()
+
+    def __len__(self):
+        return len(self._clients)
+
+
+client_pool = AsanaClientPool()
@@ -13,3 +13,75 @@ key = 'c8OHE_EXWAmD8yxqbMrJLrGnVfMveROTKy9gq-ocAI0='
 db_url = os.getenv('DATABASE_URL')
 if db_url.startswith('postgres://'):
     db_url = db_url.replace('postgres://', 'postgresql://')
+# Той самий URL з асинхронним драйвером
+async_db_url = db_url.replace('postgresql://', 'postgresql+asyncpg://', 1).replace('sqlite://', 'sqlite+aiosqlite://', 1)
+
+# Пул Asana клієнтів
+asana_client_pool_size = int(os.getenv('ASANA_CLIENT_POOL_SIZE', 256))
+asana_client_idle_ttl = int(os.getenv('ASANA_CLIENT_IDLE_TTL', 30 * 60))
+
+# Asana HTTP транспорт
+asana_request_timeout = float(os.getenv('ASANA_REQUEST_TIMEOUT', 30))
+asana_connection_limit = int(os.getenv('ASANA_CONNECTION_LIMIT', 100))
+
+# Пул потоків для блокуючих викликів
+blocking_pool_size = int(os.getenv('BLOCKING_POOL_SIZE', 16))
+blocking_per_user_limit = int(os.getenv('BLOCKING_PER_USER_LIMIT', 2))
+
+# Стан FSM у базі: незмінний довше за FSM_STATE_TTL вважається покинутим і видаляється
+fsm_state_ttl = float(os.getenv('FSM_STATE_TTL', 24 * 60 * 60))
+fsm_purge_interval = float(os.getenv('FSM_PURGE_INTERVAL', 60 * 60))
+
+# Ключ шифрування Asana токенів у базі (utils.token_vault) та кеш розшифрованих токенів.
+# Ключ обов'язковий і має відрізнятися від key: той лежить у репозиторії і шифрує токени для користувача
+# (згенерувати: python -c "from utils.token_encryption import generate_key; print(generate_key())")
+token_vault_key = os.getenv('TOKEN_VAULT_KEY')
+token_vault_cache_ttl = float(os.getenv('TOKEN_VAULT_CACHE_TTL', 10 * 60))
+token_vault_cache_size = int(os.getenv('TOKEN_VAULT_CACHE_SIZE', 10000))
+
+# Кеш рядків Users і DefaultSettings
+db_cache_ttl = float(os.getenv('DB_CACHE_TTL', 5 * 60))
+db_cache_size = int(os.getenv('DB_CACHE_SIZE', 10000))
+
+# Кеш робочих просторів/проектів/секцій
+metadata_cache_ttl = int(os.getenv('METADATA_CACHE_TTL', 10 * 60))
+metadata_cache_size = int(os.getenv('METADATA_CACHE_SIZE', 4096))
+
+# Знімки задач проектів
+task_snapshot_sync_interval = float(os.getenv('TASK_SNAPSHOT_SYNC_INTERVAL', 15))
+task_snapshot_ttl = int(os.getenv('TASK_SNAPSHOT_TTL', 6 * 60 * 60))
+task_snapshot_size = int(os.getenv('TASK_SNAPSHOT_SIZE', 1000))
+
+# Ліміти запитів до Asana на один токен
+asana_rate_limit_per_minute = float(os.getenv('ASANA_RATE_LIMIT_PER_MINUTE', 150))
+asana_rate_burst = float(os.getenv('ASANA_RATE_BURST', 50))
+asana_max_concurrent_reads = int(os.getenv('ASANA_MAX_CONCURRENT_READS', 50))
+asana_max_concurrent_writes = int(os.getenv('ASANA_MAX_CONCURRENT_WRITES', 15))
+asana_max_retries = int(os.getenv('ASANA_MAX_RETRIES', 5))
+
+# Вікно, за яке поодинокі дії з одним токеном збираються в запит до /batch (секунди)
+asana_batch_window = float(os.getenv('ASANA_BATCH_WINDOW', 0.01))
+
+# Скільки чатів щоденне нагадування обробляє одночасно
+notification_concurrency = int(os.getenv('NOTIFICATION_CONCURRENCY', 20))
+
+# Ліміти відправки повідомлень у Telegram
+telegram_global_rate = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+telegram_chat_rate = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+telegram_group_rate_per_minute = float(os.getenv('TELEGRAM_GROUP_RATE_PER_MINUTE', 20))
+telegram_chat_burst = float(os.getenv('TELEGRAM_CHAT_BURST', 3))
+telegram_send_workers = int(os.getenv('TELEGRAM_SEND_WORKERS', 8))
+telegram_max_retries = int(os.getenv('TELEGRAM_MAX_RETRIES', 3))
+
+# Час щоденного нагадування за замовчуванням і розкид завантаження проектів у межах слоту (секунди)
+default_digest_time = os.getenv('DEFAULT_DIGEST_TIME', '09:00')
+default_timezone = os.getenv('DEFAULT_TIMEZONE', 'Europe/Kiev')
+digest_spread = float(os.getenv('DIGEST_SPREAD', 60))
+digest_misfire_grace_time = int(os.getenv('DIGEST_MISFIRE_GRACE_TIME', 60 * 60))
+
+# Попередній розрахунок задач на сьогодні: як часто і скільки розрахунок вважається свіжим (секунди)
+due_today_interval = int(os.getenv('DUE_TODAY_INTERVAL', 30 * 60))
+due_today_max_age = int(os.getenv('DUE_TODAY_MAX_AGE', 2 * 60 * 60))
+
+# Telegram id адміністраторів бота через кому
+admin_ids = {int(admin_id) for admin_id in os.getenv('ADMIN_IDS', '').split(',') if admin_id.strip()}
@@ -0,0 +1,75 @@
+import logging
+import re
+
+import pytz
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from db.functions import get_digest_slots
+from db.models import get_engine
+from utils.config import default_digest_time, default_timezone, digest_misfire_grace_time
+from utils.executor import run_blocking
+
+digest_jobstore = 'digest'
+
+# Службові задачі живуть у пам'яті, розклад нагадувань - у базі, тож переживає перезапуск.
+# Пропущене через рестарт нагадування виконується один раз, якщо запізнення менше misfire_grace_time.
+scheduler = AsyncIOScheduler(
+    jobstores={'default': MemoryJobStore()},
+    job_defaults={'coalesce': True, 'misfire_grace_time': digest_misfire_grace_time},
+)
+
+
+# Сховище розкладу підключається лише під час запуску бота, імпорт модуля не звертається до бази
+def start_scheduler():
+    scheduler.add_jobstore(SQLAlchemyJobStore(engine=get_engine(), tablename='apscheduler_jobs'), digest_jobstore)
+    scheduler.start()
+
+
+def parse_digest_time(text: str) -> str | None:
+    match = re.fullmatch(r'(\d{1,2}):(\d{2})', text.strip())
+    if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+        return None
+    return f"{int(match.group(1)):02d}:{match.group(2)}"
+
+
+def is_valid_timezone(name: str) -> bool:
+    try:
+        pytz.timezone(name)
+        return True
+    except pytz.UnknownTimeZoneError:
+        return False
+
+
+def digest_job_id(digest_time: str, timezone: str) -> str:
+    return f"digest:{digest_time}:{timezone}"
+
+
+# Одна задача планувальника на кожну пару (час, часовий пояс), що зустрічається серед чатів.
+# Слот за замовчуванням існує завжди: він надсилає "задач немає" тим, хто це ввімкнув.
+async def sync_digest_jobs():
+    slots = await get_digest_slots()
+    # Сховище задач синхронне, тож звірка йде в пулі потоків
+    await run_blocking(apply_digest_slots, slots)
+
+
+def apply_digest_slots(slots: set[tuple[str, str]], target_scheduler: AsyncIOScheduler = scheduler):
+    slots = set(slots) | {(default_digest_time, default_timezone)}
+    wanted = {digest_job_id(digest_time, timezone): (digest_time, timezone) for digest_time, timezone in slots}
+
+    for job in target_scheduler.get_jobs(jobstore=digest_jobstore):
+        if job.id not in wanted:
+            target_scheduler.remove_job(job.id, jobstore=digest_jobstore)
+
+    existing = {job.id for job in target_scheduler.get_jobs(jobstore=digest_jobstore)}
+    for job_id, (digest_time, timezone) in wanted.items():
+        if job_id in existing:
+            continue
+        hour, minute = digest_time.split(':')
+        target_scheduler.add_job('utils.notifications:daily_notification',
+                                 CronTrigger(hour=int(hour), minute=int(minute), timezone=pytz.timezone(timezone)),
+                                 args=[digest_time, timezone], id=job_id, jobstore=digest_jobstore,
+                                 replace_existing=True)
+        logging.info(f"Scheduled daily digest at {digest_time} {timezone}")
@@ -0,0 +1,72 @@
+import asyncio
+import datetime
+
+import pytz
+
+from db.functions import get_default_settings_for_notification, replace_due_today_tasks, get_due_today_tasks, \
+    purge_due_today
+from utils.asana_functions import get_asana_client
+from utils.config import notification_concurrency, due_today_max_age
+from utils.job_report import job_run, count, error, timed
+from utils.task_snapshot import task_snapshots
+
+
+# Фоновий розрахунок задач на сьогодні та завтра для кожного прив'язаного проекту.
+# Дані беруться зі знімків проектів (інкрементально через /events) і зберігаються в DueTodayTasks,
+# тож нагадування та /duetoday читають таблицю і не залежать від швидкості Asana.
+# Задача запускається періодично: проект, який не вдалося перерахувати, повториться в наступному запуску.
+async def precompute_due_today():
+    async with job_run('precompute_due_today'):
+        await precompute_projects()
+
+
+async def precompute_projects():
+    chats = await get_default_settings_for_notification()
+    projects = {}
+    for chat in chats:
+        if chat.project_id:
+            projects.setdefault(chat.project_id, []).append(chat)
+
+    semaphore = asyncio.Semaphore(notification_concurrency)
+
+    async def compute(project_id, project_chats):
+        async with semaphore:
+            with timed(f"project {project_id}"):
+                await compute_project(project_id, project_chats)
+
+    await asyncio.gather(*[compute(project_id, project_chats) for project_id, project_chats in projects.items()])
+
+    yesterday = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+    await purge_due_today(yesterday)
+
+
+async def compute_project(project_id: str, chats: list) -> bool:
+    # "Сьогодні" і "завтра" залежать від часового поясу кожного чату
+    dates = set()
+    for chat in chats:
+        local_today = datetime.datetime.now(pytz.timezone(chat.timezone)).date()
+        dates.update([local_today.isoformat(), (local_today + datetime.timedelta(days=1)).isoformat()])
+
+    for chat in chats:
+        try:
+            asana_client = await get_asana_client(chat.notification_user_id)
+            if asana_client is None:
+                continue
+            snapshot = await task_snapshots.get(project_id, asana_client)
+            count('tasks_scanned', len(snapshot.tasks))
+            tasks = [dict(task, gid=gid) for gid, task in snapshot.tasks.items()
+                     if task['due_on'] in dates and task['assignee_gid']]
+            await replace_due_today_tasks(project_id, sorted(dates), tasks)
+            return True
+        except Exception as e:
+            error(f"Error precomputing due tasks for project {project_id} with chat {chat.chat_id}: {e}")
+    return False
+
+
+# Задачі проекту на дату з таблиці; None, якщо проект давно не перераховувався
+async def cached_due_tasks(project_id: str, due_on: str) -> list[dict] | None:
+    rows = await get_due_today_tasks(project_id, due_on, due_today_max_age)
+    if rows is None:
+        return None
+    return [{'gid': row.task_gid, 'name': row.task_name, 'assignee_gid': row.assignee_gid, 'due_on': row.due_on}
+            for row in rows]
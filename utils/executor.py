@@ -0,0 +1,60 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.config import blocking_pool_size, blocking_per_user_limit
+
+
+# Обмежений пул потоків для блокуючих викликів (requests, сховище задач APScheduler).
+# Семафор на користувача не дає одному користувачу зайняти всі потоки пулу.
+class BlockingExecutor:
+    def __init__(self, max_workers: int = blocking_pool_size, per_user_limit: int = blocking_per_user_limit):
+        self.max_workers = max_workers
+        self.per_user_limit = per_user_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='blocking')
+        self._user_slots: dict[int, asyncio.Semaphore] = {}
+        self._user_waiters: dict[int, int] = {}
+        self._active = 0
+
+    async def run(self, func, *args, user_id: int | None = None, **kwargs):
+        call = functools.partial(func, *args, **kwargs)
+        if user_id is None:
+            return await self._submit(call)
+
+        semaphore = self._user_slots.get(user_id)
+        if semaphore is None:
+            semaphore = self._user_slots[user_id] = asyncio.Semaphore(self.per_user_limit)
+        self._user_waiters[user_id] = self._user_waiters.get(user_id, 0) + 1
+        try:
+            async with semaphore:
+                return await self._submit(call)
+        finally:
+            # Семафори тримаємо лише для користувачів, у яких є виклики в роботі
+            self._user_waiters[user_id] -= 1
+            if not self._user_waiters[user_id]:
+                del self._user_waiters[user_id]
+                del self._user_slots[user_id]
+
+    def stats(self) -> dict:
+        return {
+            'max_workers': self.max_workers,
+            'active': self._active,
+            'users': len(self._user_slots),
+        }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    async def _submit(self, call):
+        self._active += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        finally:
+            self._active -= 1
+
+
+blocking_executor = BlockingExecutor()
+
+
+async def run_blocking(func, *args, user_id: int | None = None, **kwargs):
+    return await blocking_executor.run(func, *args, user_id=user_id, **kwargs)
@@ -1,5 +1,8 @@
 import datetime
 import json
+import re
+
+import pytz
 
 from aiogram import Router, F
 from aiogram.filters import Command, CommandStart, StateFilter
@@ -7,10 +10,14 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove, InlineKeyboardButton, \
     InlineKeyboardMarkup
 
-from bot.bot_instance import bot
+from utils.asana_batch import asana_batch, batch_action
 from utils.asana_functions import *
 from utils.config import *
+from utils.digest_schedule import parse_digest_time, is_valid_timezone, sync_digest_jobs
+from utils.due_today import cached_due_tasks
+from utils.executor import run_blocking
 from utils.help_command import process_help_command
+from utils.metadata_cache import metadata_cache
 from utils.parse_message import parse_message_complete
 from utils.refresh_token_wrap import refresh_token
 from utils.states.authorization import Authorization
@@ -18,14 +25,15 @@ from utils.states.comment_task import CommentTask
 from utils.states.default_settings import DefaultSettings
 from utils.states.default_settings_private import DefaultSettingsPrivate
 from utils.states.report_task import ReportTask
+from utils.task_queries import find_user_tasks
+from utils.task_snapshot import task_snapshots
 from utils.token_encryption import *
 
 router = Router()
 
 
 @router.message(CommandStart(), F.chat.type == 'private')
-async def start(message: Message, state: FSMContext) -> None:
-    user = get_user(message.from_user.id)
+async def start(message: Message, state: FSMContext, user) -> None:
     if user is not None and user.asana_token is not None:
         await message.answer("Ви вже авторизовані!")
         return
@@ -60,7 +68,7 @@ async def start(message: Message, state: FSMContext) -> None:
 
 
 @router.message(Authorization.token)
-async def process_token(message: Message, state: FSMContext) -> None:
+async def process_token(message: Message, state: FSMContext, user) -> None:
     new_user = False
     if message.text == "Скасувати":
         await state.clear()
@@ -69,20 +77,21 @@ async def process_token(message: Message, state: FSMContext) -> None:
     elif is_valid_token_format(message.text):
         token, refresh_token = decrypt_tokens(key, message.text)
         try:
-            asana_id = get_asana_id(token)
+            asana_id = await get_asana_id(token)
         except Exception:
             await message.reply("Невірний токен. Будь ласка, спробуйте ще раз.")
             return
 
-        asana_client = get_asana_client(message.from_user.id, token)
+        asana_client = await get_asana_client(message.from_user.id, token)
         if not asana_client:
             await message.reply("Не вдалося підключитися до Asana. Будь ласка, перевірте ваш токен.")
             return
 
+        # Новий токен може бачити інші простори, тому старі дані користувача відкидаємо
+        metadata_cache.invalidate(message.from_user.id)
         try:
-            workspaces_generator = asana.WorkspacesApi(asana_client).get_workspaces({'opt_fields': 'name'})
-            workspaces = {workspace['gid']: workspace['name'] for workspace in workspaces_generator}
-        except asana.rest.ApiException as e:
+            workspaces = await metadata_cache.workspaces(message.from_user.id, asana_client)
+        except AsanaError as e:
             if e.status == 401:
                 await message.reply("Токен не дійсний або був відкликаний. Будь ласка, авторизуйтесь знову.")
                 return
@@ -90,19 +99,19 @@ async def process_token(message: Message, state: FSMContext) -> None:
                 await message.reply(f"Сталася помилка при отриманні робочих просторів: {e}")
                 return
 
-        user = get_user(message.from_user.id)
         if not user:
             new_user = True
-        create_user(message.from_user.id, message.from_user.first_name, message.from_user.username, token,
-                    refresh_token, asana_id)
+        await create_user(message.from_user.id, message.from_user.first_name, message.from_user.username,
+                          token, refresh_token, asana_id)
         await message.answer(f"Ви успішно авторизувалися!", reply_markup=ReplyKeyboardRemove())
+        metadata_cache.prefetch(message.from_user.id, await get_asana_client(message.from_user.id))
 
         await state.clear()
 
         if len(workspaces) == 1:
             workspace_gid, workspace_name = next(iter(workspaces.items()))
-            settings = create_default_settings_private(message.chat.id, workspace_gid, workspace_name,
-                                                       message.from_user.id)
+            settings = await create_default_settings_private(message.chat.id, workspace_gid,
+                                                             workspace_name, message.from_user.id)
             if settings:
                 await message.answer(
                     f"За замовченням для Ваших задач в цьому чаті буде використовуватися робочий простір “{workspace_name}”")
@@ -130,18 +139,17 @@ async def process_token(message: Message, state: FSMContext) -> None:
 
 
 @router.message(StateFilter(DefaultSettingsPrivate.workspace))
-async def select_workspace_private(message: Message, state: FSMContext):
+async def select_workspace_private(message: Message, state: FSMContext, asana_client):
     workspace_name = message.text
     if workspace_name == "Скасувати":
         await state.clear()
         await message.answer("Дія скасована.", reply_markup=ReplyKeyboardRemove())
         return
 
-    asana_client = get_asana_client(message.from_user.id)
-    workspaces = asana.WorkspacesApi(asana_client).get_workspaces({'opt_fields': 'name'})
-    workspace_id = next((workspace['gid'] for workspace in workspaces if workspace['name'] == workspace_name), None)
+    workspace_id = await metadata_cache.workspace_gid(message.from_user.id, asana_client, workspace_name)
 
-    settings = create_default_settings_private(message.chat.id, workspace_id, workspace_name, message.from_user.id)
+    settings = await create_default_settings_private(message.chat.id, workspace_id, workspace_name,
+                                                     message.from_user.id)
 
     if settings:
         await message.answer(f"Ваш робочий простір за замовченням - “{workspace_name}”.",
@@ -159,9 +167,7 @@ async def select_workspace_private(message: Message, state: FSMContext):
 
 
 @router.message(Command("stop"), F.chat.type == 'private')
-async def revoke_asana_token(message: Message):
-    user = get_user(message.from_user.id)
-    settings = get_default_settings(message.chat.id)
+async def revoke_asana_token(message: Message, user, settings):
     if not user or not user.asana_token or not user.asana_refresh_token:
         await message.reply("Ви і без цього не були зареєстровані.")
         if settings.toggle_stickers:
@@ -174,12 +180,14 @@ async def revoke_asana_token(message: Message):
         'token': user.asana_refresh_token
     }
 
-    response = requests.post(url, data=payload)
+    response = await run_blocking(requests.post, url, data=payload, user_id=message.from_user.id)
 
     if response.status_code == 200:
         logging.debug("Token successfully revoked.")
-        create_user(message.from_user.id, message.from_user.first_name, message.from_user.username, None, None,
-                    user.asana_id)
+        client_pool.discard(message.from_user.id)
+        metadata_cache.invalidate(message.from_user.id)
+        await create_user(message.from_user.id, message.from_user.first_name,
+                          message.from_user.username, None, None, user.asana_id)
         await message.answer("Ваш токен успішно видалено.")
         if settings.toggle_stickers:
             await message.answer_sticker("CAACAgIAAxkBAAELD7ZljiPT4kdgBgABT8XJDtHCqm9YynEAAtoIAAJcAmUD7sMu8F-uEy80BA")
@@ -187,24 +195,51 @@ async def revoke_asana_token(message: Message):
         logging.debug("Failed to revoke token:", response.text)
 
 
+# Звіти останніх запусків запланованих задач, лише для ADMIN_IDS
+@router.message(Command("jobs"))
+async def jobs_command(message: Message):
+    if message.from_user.id not in admin_ids:
+        return
+    parts = message.text.split()
+    limit = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 10
+    runs = await get_job_runs(min(limit, 50))
+    if not runs:
+        await message.answer("Запусків ще не було.")
+        return
+
+    lines = ["Останні запуски:"]
+    for run in runs:
+        lines.append(f"🔸 {run.started_at:%Y-%m-%d %H:%M} {run.job_name}: {run.status}, {run.duration:.1f}s, "
+                     f"Asana {run.asana_calls}, задач {run.tasks_scanned}, "
+                     f"повідомлень {run.messages_sent}/{run.messages_failed}, "
+                     f"оновлень токенів {run.token_refreshes}, помилок {run.error_count}")
+
+    details = json.loads(runs[0].details or '{}')
+    if details.get('slowest'):
+        lines.append(f"\nНайповільніші в {runs[0].job_name}:")
+        lines.extend(f"🔸 {key}: {seconds:.1f}s" for key, seconds in details['slowest'][:5])
+    if details.get('errors'):
+        lines.append("\nПомилки:")
+        lines.extend(f"🔸 {error_text}" for error_text in details['errors'][:5])
+    await message.answer("\n".join(lines))
+
+
 @router.message(Command("delete"), F.chat.type == 'private')
-async def delete_command(message: Message):
-    user = get_user(message.from_user.id)
+async def delete_command(message: Message, user, settings):
     delete_result = False
     if user:
-        delete_result = delete_user(message.from_user.id)
+        delete_result = await delete_user(message.from_user.id)
+        client_pool.discard(message.from_user.id)
+        metadata_cache.invalidate(message.from_user.id)
     if delete_result or not user:
         await message.reply("Вас було успішно видалено з бази даних.")
-        settings = get_default_settings(message.chat.id)
-        if settings.toggle_stickers:
+        if settings and settings.toggle_stickers:
             await message.answer_sticker("CAACAgIAAxkBAAELD7ZljiPT4kdgBgABT8XJDtHCqm9YynEAAtoIAAJcAmUD7sMu8F-uEy80BA")
 
 
-async def process_stickers_command(message: Message):
-    settings = get_default_settings(message.chat.id)
+async def process_stickers_command(message: Message, settings):
     if settings:
-        toggle_stickers(message.chat.id)
-        if settings.toggle_stickers:
+        if await toggle_stickers(message.chat.id):
             await message.answer_sticker("CAACAgIAAxkBAAELD7ZljiPT4kdgBgABT8XJDtHCqm9YynEAAtoIAAJcAmUD7sMu8F-uEy80BA")
         else:
             await message.answer("Наліпки вимкнеко.")
@@ -212,10 +247,34 @@ async def process_stickers_command(message: Message):
         await message.answer("Спочатку оберіть налаштування за умовчанням за допомогою команди /link в цьому чаті")
 
 
-async def process_link_command(message: Message, state: FSMContext) -> None:
-    asana_client = get_asana_client(message.from_user.id)
-    workspaces = asana.WorkspacesApi(asana_client).get_workspaces({'opt_fields': 'name'})
-    workspace_buttons = [KeyboardButton(text=workspace['name']) for workspace in workspaces]
+async def process_notify_command(message: Message):
+    enabled = await toggle_notify_empty(message.from_user.id)
+    if enabled is None:
+        await message.answer("Спочатку ви маєте зареєструватися.")
+    elif enabled:
+        await message.answer("Щоденне нагадування надходитиме навіть тоді, коли задач на сьогодні немає.")
+    else:
+        await message.answer("Щоденне нагадування надходитиме лише тоді, коли є задачі на сьогодні.")
+
+
+# digest 08:30 [Europe/Kiev] - час щоденного нагадування для чату
+async def process_digest_command(message: Message, settings):
+    parts = message.text.split('digest', 1)[1].split()
+    digest_time = parse_digest_time(parts[0]) if parts else None
+    timezone = parts[1] if len(parts) > 1 else settings.timezone
+    if digest_time is None or not is_valid_timezone(timezone):
+        await message.answer("Вкажіть час у форматі ГГ:ХХ і, за бажанням, часовий пояс, наприклад: "
+                             "digest 08:30 Europe/Kiev")
+        return
+
+    await set_digest_time(message.chat.id, digest_time, timezone)
+    await sync_digest_jobs()
+    await message.answer(f"Щоденне нагадування для цього чату надходитиме о {digest_time} ({timezone}).")
+
+
+async def process_link_command(message: Message, state: FSMContext, asana_client) -> None:
+    workspaces = await metadata_cache.workspaces(message.from_user.id, asana_client)
+    workspace_buttons = [KeyboardButton(text=workspace) for workspace in workspaces.values()]
     workspace_buttons.append(KeyboardButton(text="Скасувати"))
     keyboard = ReplyKeyboardMarkup(
         keyboard=[workspace_buttons],
@@ -227,22 +286,20 @@ async def process_link_command(message: Message, state: FSMContext) -> None:
 
 
 @router.message(StateFilter(DefaultSettings.workspace))
-async def select_project(message: Message, state: FSMContext) -> None:
+async def select_project(message: Message, state: FSMContext, asana_client) -> None:
     if message.text == "Скасувати":
         await state.clear()
         await message.answer("Дія скасована. Попередні налаштування збережено.", reply_markup=ReplyKeyboardRemove())
         return
 
     workspace_name = message.text
-    asana_client = get_asana_client(message.from_user.id)
 
-    workspaces = asana.WorkspacesApi(asana_client).get_workspaces({'opt_fields': 'name'})
-    workspace_id = next((workspace['gid'] for workspace in workspaces if workspace['name'] == workspace_name), None)
+    workspace_id = await metadata_cache.workspace_gid(message.from_user.id, asana_client, workspace_name)
     await state.update_data(workspace_name=workspace_name)
     await state.update_data(workspace_id=workspace_id)
 
-    projects = asana.ProjectsApi(asana_client).get_projects({'workspace': workspace_id, 'opt_fields': 'name'})
-    project_buttons = [[KeyboardButton(text=project['name'])] for project in projects]
+    projects = await metadata_cache.projects(message.from_user.id, asana_client, workspace_id)
+    project_buttons = [[KeyboardButton(text=project)] for project in projects.values()]
     project_buttons.append([KeyboardButton(text="Скасувати")])
     keyboard = ReplyKeyboardMarkup(
         keyboard=project_buttons,
@@ -255,7 +312,7 @@ async def select_project(message: Message, state: FSMContext) -> None:
 
 
 @router.message(StateFilter(DefaultSettings.project))
-async def select_section(message: Message, state: FSMContext) -> None:
+async def select_section(message: Message, state: FSMContext, asana_client) -> None:
     if message.text == "Скасувати":
         await state.clear()
         await message.answer("Дія скасована. Попередні налаштування збережено.", reply_markup=ReplyKeyboardRemove())
@@ -264,16 +321,14 @@ async def select_section(message: Message, state: FSMContext) -> None:
     project_name = message.text
     data = await state.get_data()
     workspace_id = data['workspace_id']
-    asana_client = get_asana_client(message.from_user.id)
 
-    projects = asana.ProjectsApi(asana_client).get_projects({'workspace': workspace_id, 'opt_fields': 'name'})
-    project_id = next((project['gid'] for project in projects if project['name'] == project_name), None)
+    project_id = await metadata_cache.project_gid(message.from_user.id, asana_client, workspace_id, project_name)
 
     await state.update_data(project_name=project_name)
     await state.update_data(project_id=project_id)
 
-    sections = asana.SectionsApi(asana_client).get_sections_for_project(project_id, {'opt_fields': 'name'})
-    section_buttons = [[KeyboardButton(text=section['name'])] for section in sections]
+    sections = await metadata_cache.sections(message.from_user.id, asana_client, project_id)
+    section_buttons = [[KeyboardButton(text=section)] for section in sections.values()]
     section_buttons.append([KeyboardButton(text="Скасувати")])
     keyboard = ReplyKeyboardMarkup(
         keyboard=section_buttons,
@@ -286,7 +341,7 @@ async def select_section(message: Message, state: FSMContext) -> None:
 
 
 @router.message(StateFilter(DefaultSettings.section))
-async def save_settings(message: Message, state: FSMContext) -> None:
+async def save_settings(message: Message, state: FSMContext, asana_client) -> None:
     if message.text == "Скасувати":
         await state.clear()
         await message.answer("Дія скасована. Попередні налаштування збережено.", reply_markup=ReplyKeyboardRemove())
@@ -299,9 +354,7 @@ async def save_settings(message: Message, state: FSMContext) -> None:
     project_id = data['project_id']
     section_name = message.text
 
-    asana_client = get_asana_client(message.from_user.id)
-    sections = asana.SectionsApi(asana_client).get_sections_for_project(project_id, {'opt_fields': 'name'})
-    section_id = next((section['gid'] for section in sections if section['name'] == section_name), None)
+    section_id = await metadata_cache.section_gid(message.from_user.id, asana_client, project_id, section_name)
 
     # save settings
     await state.update_data(
@@ -311,18 +364,22 @@ async def save_settings(message: Message, state: FSMContext) -> None:
     # send settings
     settings = await state.get_data()
 
-    create_default_settings(message.chat.id, settings["workspace_id"], settings["workspace_name"],
-                            settings["project_id"], settings["project_name"], section_id, section_name,
-                            message.from_user.id)
+    await create_default_settings(message.chat.id, settings["workspace_id"], settings["workspace_name"],
+                                  settings["project_id"], settings["project_name"], section_id, section_name,
+                                  message.from_user.id)
     await message.answer("Налаштування успішно змінено!", reply_markup=ReplyKeyboardRemove())
-    settings = get_default_settings(message.chat.id)
+    # Новий чат може додати слот нагадувань
+    await sync_digest_jobs()
+    settings = await get_default_settings(message.chat.id)
     if settings.toggle_stickers:
         await message.answer_sticker("CAACAgIAAxkBAAELD7ZljiPT4kdgBgABT8XJDtHCqm9YynEAAtoIAAJcAmUD7sMu8F-uEy80BA")
     await state.clear()
 
 
-async def process_duetoday_command(message: Message, user_id: int, project_id: str):
-    user_tasks_dict = get_todays_tasks_for_user_in_workspace(user_id, project_id)
+async def process_duetoday_command(message: Message, user, asana_client, workspace_id: str, project_id: str | None,
+                                   timezone: str):
+    user_tasks_dict = await get_todays_tasks_for_user_in_workspace(user, asana_client, workspace_id, project_id,
+                                                                   timezone)
     if not user_tasks_dict:
         await message.answer("На сьогодні задач немає.")
         return
@@ -332,54 +389,64 @@ async def process_duetoday_command(message: Message, user_id: int, project_id: s
     await message.answer(answer_text)
 
 
-async def process_complete_command(message: Message, state: FSMContext, user_id: int, project_id: str):
-    user_tasks_dict = get_all_tasks_for_user_in_workspace(user_id, project_id)
+async def process_complete_command(message: Message, state: FSMContext, user, asana_client, workspace_id: str,
+                                   project_id: str | None):
+    user_tasks_dict = await get_all_tasks_for_user_in_workspace(user, asana_client, workspace_id, project_id)
     if not user_tasks_dict:
         await message.answer("Задач немає.")
         return
 
-    task_buttons = [[KeyboardButton(text=task['name'])] for task in user_tasks_dict.values()]
-    task_buttons.append([KeyboardButton(text="Скасувати")])
-    keyboard = ReplyKeyboardMarkup(
-        keyboard=task_buttons,
-        resize_keyboard=True,
-        one_time_keyboard=True
-    )
+    keyboard = task_choice_keyboard(user_tasks_dict)
 
-    if task_buttons:
+    if user_tasks_dict:
         await message.answer("Оберіть задачу, яку бажаєте здати:", reply_markup=keyboard)
         await state.set_state(ReportTask.TaskName)
-        await state.update_data(user_tasks_dict=user_tasks_dict)
+        # У стані лише gid задач у порядку кнопок, а не весь список з назвами
+        await state.update_data(task_gids=list(user_tasks_dict))
     else:
         await message.answer("Наразі немає доступних задач.")
 
 
-async def process_comment_command(message: Message, state: FSMContext, user_id, project_id, comment):
-    user_tasks_dict = get_all_tasks_for_user_in_workspace(user_id, project_id)
+async def process_comment_command(message: Message, state: FSMContext, user, asana_client, workspace_id, project_id,
+                                  comment):
+    user_tasks_dict = await get_all_tasks_for_user_in_workspace(user, asana_client, workspace_id, project_id)
 
     if not user_tasks_dict:
         await message.answer("Задач немає.")
         return
 
-    task_buttons = [[KeyboardButton(text=task['name'])] for task in user_tasks_dict.values()]
+    keyboard = task_choice_keyboard(user_tasks_dict)
+
+    if user_tasks_dict:
+        await message.answer("Оберіть задачу, на яку бажаєте додати коментар:", reply_markup=keyboard)
+        await state.set_state(CommentTask.Comment)
+        await state.update_data(task_gids=list(user_tasks_dict), comment=comment)
+    else:
+        await message.answer("Наразі немає доступних задач.")
+
+
+# Кнопки задач пронумеровані: номер з натиснутої кнопки вказує на gid у стані FSM
+def task_choice_keyboard(user_tasks_dict: dict) -> ReplyKeyboardMarkup:
+    task_buttons = [[KeyboardButton(text=f"{number}. {task['name']}")]
+                    for number, task in enumerate(user_tasks_dict.values(), 1)]
     task_buttons.append([KeyboardButton(text="Скасувати")])
-    keyboard = ReplyKeyboardMarkup(
+    return ReplyKeyboardMarkup(
         keyboard=task_buttons,
         resize_keyboard=True,
         one_time_keyboard=True
     )
 
-    if task_buttons:
-        await message.answer("Оберіть задачу, на яку бажаєте додати коментар:", reply_markup=keyboard)
-        await state.set_state(CommentTask.Comment)
-        await state.update_data(user_tasks_dict=user_tasks_dict, comment=comment)
-    else:
-        await message.answer("Наразі немає доступних задач.")
+
+def selected_task_gid(text: str, task_gids: list[str]) -> str | None:
+    match = re.match(r'(\d+)\.', text or '')
+    if not match or not 1 <= int(match.group(1)) <= len(task_gids):
+        return None
+    return task_gids[int(match.group(1)) - 1]
 
 
 @router.message(Command("asana"))
 @refresh_token
-async def asana_command(message: Message, state: FSMContext):
+async def asana_command(message: Message, state: FSMContext, user, settings, asana_client):
     text = message.text
     logging.debug(f"Received message: {text}")  # Debugging logging.debug
 
@@ -391,32 +458,39 @@ async def asana_command(message: Message, state: FSMContext):
 
         # Special handling for 'link' command since it sets up user settings
         if command == "link":
-            await process_link_command(message, state)
+            await process_link_command(message, state, asana_client)
             return  # Skip further processing once link is handled
 
         # Check settings only for non-link commands
-        settings = get_default_settings(message.chat.id)
-
         if not settings and command != "link":
             return await message.reply(
                 "Будь ласка, спочатку оберіть налаштування за допомогою команди /link в цьому чаті.")  # Exit command if settings are not found and it's not the 'link' command
 
         # Now process other commands, assuming settings are valid
         if command == "complete":
-            await process_complete_command(message, state, message.from_user.id, settings.project_id)
+            await process_complete_command(message, state, user, asana_client, settings.workspace_id,
+                                           settings.project_id)
 
         elif command == "duetoday":
-            await process_duetoday_command(message, message.from_user.id, settings.project_id)
+            await process_duetoday_command(message, user, asana_client, settings.workspace_id, settings.project_id,
+                                           settings.timezone)
 
         elif command == "help":
             await process_help_command(message)
 
         elif command == "stickers":
-            await process_stickers_command(message)
+            await process_stickers_command(message, settings)
+
+        elif command == "notify":
+            await process_notify_command(message)
+
+        elif command == "digest":
+            await process_digest_command(message, settings)
 
         elif command == "comment":
             comment = message.text.split(maxsplit=2)[2]
-            await process_comment_command(message, state, message.from_user.id, settings.project_id, comment)
+            await process_comment_command(message, state, user, asana_client, settings.workspace_id,
+                                          settings.project_id, comment)
 
         return
 
@@ -427,15 +501,15 @@ async def asana_command(message: Message, state: FSMContext):
     task_name = parsed_data["task_name"]
     description = parsed_data["description"]
     date = parsed_data["date"]
-    assignees = parsed_data["assignees"]
-
-    asana_client = get_asana_client(message.from_user.id)
-    settings = get_default_settings(message.chat.id)
+    assignees = list(dict.fromkeys(parsed_data["assignees"]))
 
     due_date = date
 
-    assignee_asana_id = get_asana_id_by_username(assignees[0]) if assignees else get_asana_id_by_tg_id(
-        message.from_user.id)
+    assignee_ids = await resolve_assignees(user, assignees)
+    unknown_text = unknown_assignees_text(assignees, assignee_ids)
+    if unknown_text:
+        await message.answer(unknown_text)
+        return
 
     logging.debug(settings.workspace_id, settings.workspace_name, '\n\n', settings.project_id, settings.project_name)
 
@@ -448,7 +522,6 @@ async def asana_command(message: Message, state: FSMContext):
             "name": task_name,
             "notes": description,
             "workspace": settings.workspace_id,
-            "assignee": assignee_asana_id,
             "projects": [project_id],
         }
     }
@@ -459,77 +532,81 @@ async def asana_command(message: Message, state: FSMContext):
     if due_date:
         body["data"]["due_on"] = due_date.isoformat()
 
-    opts = {}
-
-    try:
-        tasks_api_instance = asana.TasksApi(asana_client)
-        response = tasks_api_instance.create_task(body, opts)
-        task_permalink = response.get('permalink_url', 'No permalink available')
-        await message.answer(f"Задача створена: [Task Link]({task_permalink})", parse_mode='Markdown')
-    except Exception as e:
-        error_message = str(e)  # Default to the full exception message
-        if hasattr(e, 'response') and e.response is not None:
-            try:
-                error_data = e.response.json()  # Parse the JSON response
-                if "errors" in error_data and len(error_data["errors"]) > 0:
-                    error_message = error_data["errors"][0]["message"]  # Extract the specific error message
-            except json.JSONDecodeError: # If the response is not JSON, ignore and use the default message
-                logging.debug(error_message)
-                await message.answer("Помилка при створенні задачі")
+    results = await create_tasks(asana_client, body["data"], assignee_ids)
+    if any(not isinstance(result, AsanaError) for result in results):
+        task_snapshots.mark_stale(project_id)
+        # Нова задача могла бути на сьогодні - до наступного розрахунку читаємо з Asana
+        await invalidate_due_today(project_id)
+    await message.answer(created_tasks_text(assignees, results), parse_mode='Markdown')
+
+
+# Asana id виконавців за @username (None - користувач не зареєстрований у боті);
+# без виконавців задача ставиться автору повідомлення
+async def resolve_assignees(user, assignees: list[str]) -> list:
+    if not assignees:
+        return [user.asana_id]
+    asana_ids = await get_asana_ids_by_usernames(assignees)
+    return [asana_ids[assignee] for assignee in assignees]
+
+
+def unknown_assignees_text(assignees: list[str], assignee_ids: list) -> str | None:
+    unknown = [f"@{assignee}" for assignee, asana_id in zip(assignees, assignee_ids) if asana_id is None]
+    if not unknown:
+        return None
+    return f"Користувачі {', '.join(unknown)} не зареєстровані в боті. Вони можуть зареєструватися командою /start."
+
+
+# Окрема задача на кожного виконавця, всі - одним запитом до /batch
+async def create_tasks(asana_client, task_data: dict, assignee_ids: list) -> list:
+    actions = [batch_action('POST', '/tasks', dict(task_data, assignee=assignee_id), 'permalink_url')
+               for assignee_id in assignee_ids]
+    results = await asana_batch.execute(asana_client, actions)
+    for result in results:
+        if isinstance(result, AsanaError):
+            logging.debug(result.message)  # Asana's own error message, if it sent one
+    return results
+
+
+def created_tasks_text(assignees: list[str], results: list) -> str:
+    if len(results) == 1:
+        if isinstance(results[0], AsanaError):
+            return "Помилка при створенні задачі"
+        return f"Задача створена: [Task Link]({results[0].get('permalink_url', 'No permalink available')})"
+
+    lines = ["Задачі створено:"]
+    for assignee, result in zip(assignees, results):
+        if isinstance(result, AsanaError):
+            lines.append(f"🔸 @{assignee}: помилка при створенні задачі")
+        else:
+            lines.append(f"🔸 @{assignee}: [Task Link]({result.get('permalink_url', 'No permalink available')})")
+    return "\n".join(lines)
 
 
 # отримує всі задачі, незалежно від дати або її відсутності
-def get_all_tasks_for_user_in_workspace(user_id, project_id):
-    user = get_user(user_id)
-    asana_client = get_asana_client(user_id)
-    tasks_api_instance = asana.TasksApi(asana_client)
-    user_gid = get_asana_id_by_username(user.tg_username)
-    user_tasks_dict = {}
-
-    try:
-        opts = {
-            'completed_since': "now",
-            'opt_fields': "name, assignee"
-        }
-        tasks = tasks_api_instance.get_tasks_for_project(project_id, opts)
-        for task in tasks:
-            if task['assignee'] and task['assignee']['gid'] == user_gid:
-                user_tasks_dict[task['gid']] = {
-                    'name': task['name'],
-                    'assignee_gid': task['assignee']['gid'],
-                }
-    except ApiException as e:
-        logging.error(f"Error getting tasks for user {user_id}: {e}")
-
-    return user_tasks_dict
+async def get_all_tasks_for_user_in_workspace(user, asana_client, workspace_id, project_id):
+    return await get_tasks_for_user(user, asana_client, workspace_id, project_id)
 
 
 # Функція для отримання задач на сьогодні
-def get_todays_tasks_for_user_in_workspace(user_id, project_id):
-    user = get_user(user_id)
-    asana_client = get_asana_client(user_id)
-    tasks_api_instance = asana.TasksApi(asana_client)
-    user_gid = get_asana_id_by_username(user.tg_username)
-    user_tasks_dict = {}
-
+async def get_todays_tasks_for_user_in_workspace(user, asana_client, workspace_id, project_id, timezone):
+    # "Сьогодні" в часовому поясі чату, як і в нагадуванні (utils.notifications)
+    today = datetime.datetime.now(pytz.timezone(timezone)).date().isoformat()
+    # Спершу заздалегідь розрахована таблиця (utils.due_today), Asana - лише якщо розрахунок застарів
+    tasks = await cached_due_tasks(project_id, today) if project_id else None
+    if tasks is None:
+        return await get_tasks_for_user(user, asana_client, workspace_id, project_id, today)
+    return {task['gid']: {'name': task['name'], 'assignee_gid': task['assignee_gid']}
+            for task in tasks if task['assignee_gid'] == user.asana_id}
+
+
+# Фільтри за виконавцем, датою та статусом виконуються на боці Asana (див. utils.task_queries).
+# project_id може бути None - тоді це задачі користувача в робочому просторі приватного чату.
+async def get_tasks_for_user(user, asana_client, workspace_id, project_id, due_on=None):
     try:
-        today = datetime.date.today().isoformat()
-        opts = {
-            'completed_since': "now",
-            'opt_fields': "name, assignee, due_on"
-        }
-        tasks = tasks_api_instance.get_tasks_for_project(project_id, opts)
-        for task in tasks:
-            if 'due_on' in task and task['due_on'] == today and task['assignee'] and task['assignee'][
-                'gid'] == user_gid:
-                user_tasks_dict[task['gid']] = {
-                    'name': task['name'],
-                    'assignee_gid': task['assignee']['gid'],
-                }
-    except ApiException as e:
-        logging.error(f"Error getting tasks for user {user_id}: {e}")
-
-    return user_tasks_dict
+        return await find_user_tasks(asana_client, workspace_id, user.asana_id, project_id, due_on)
+    except AsanaError as e:
+        logging.error(f"Error getting tasks for user {user.tg_id}: {e}")
+        return {}
 
 
 @router.message(StateFilter(ReportTask.TaskName))
@@ -542,24 +619,19 @@ async def handle_task_selection(message: Message, state: FSMContext):
         await message.answer("Дія скасована.", reply_markup=ReplyKeyboardRemove())
         return
 
-    user_tasks_dict = data['user_tasks_dict']
-
     # Перевіряємо, чи вибрана задача є в списку задач
-    task_found = False
-    for task_gid, task_info in user_tasks_dict.items():
-        if task_info['name'] == selected_task_name:
-            task_found = True
-            await message.answer("Будь ласка, надайте звіт:")
-            await state.update_data(task_gid=task_gid)
-            await state.set_state(ReportTask.Report)
-            break
-
-    if not task_found:
+    task_gid = selected_task_gid(selected_task_name, data['task_gids'])
+    if task_gid is None:
         await message.answer("Задача не знайдена. Будь ласка, виберіть задачу зі списку.")
+        return
+
+    await message.answer("Будь ласка, надайте звіт:")
+    await state.update_data(task_gid=task_gid)
+    await state.set_state(ReportTask.Report)
 
 
 @router.message(StateFilter(ReportTask.Report))
-async def handle_task_report(message: Message, state: FSMContext):
+async def handle_task_report(message: Message, state: FSMContext, settings, asana_client):
     if message.text == "Скасувати":
         await state.clear()
         await message.answer("Дія скасована.", reply_markup=ReplyKeyboardRemove())
@@ -568,12 +640,14 @@ async def handle_task_report(message: Message, state: FSMContext):
     report_text = message.text
     data = await state.get_data()
     task_gid = data['task_gid']
-    asana_client = get_asana_client(message.from_user.id)
-    tasks_api_instance = asana.TasksApi(asana_client)
 
-    # Get the existing task details
-    task = tasks_api_instance.get_task(task_gid, {"opt_fields": "notes"})
-    existing_notes = task['notes'] if 'notes' in task else ""
+    try:
+        # Get the existing task details
+        task = await asana_batch.call(asana_client, 'GET', f'/tasks/{task_gid}', fields='notes')
+    except AsanaError as e:
+        await message.answer(f"Помилка: {e}", reply_markup=ReplyKeyboardRemove())
+        return
+    existing_notes = task.get('notes') or ""
 
     # Append the new report to the existing notes
     new_notes = f"{existing_notes}\n\n\n\n@{message.from_user.username} здав задачу {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}:\n{report_text}"
@@ -586,10 +660,11 @@ async def handle_task_report(message: Message, state: FSMContext):
     }
 
     try:
-        tasks_api_instance.update_task(body, task_gid, {})
+        await asana_batch.call(asana_client, 'PUT', f'/tasks/{task_gid}', body["data"], fields='gid')
+        task_snapshots.discard_task(task_gid)
+        await delete_due_today_task(task_gid)
         await message.answer("Звіт здано", reply_markup=ReplyKeyboardRemove())
-        settings = get_default_settings(message.chat.id)
-        if settings.toggle_stickers:
+        if settings and settings.toggle_stickers:
             await message.answer_sticker('CAACAgIAAxkBAAELD7ZljiPT4kdgBgABT8XJDtHCqm9YynEAAtoIAAJcAmUD7sMu8F-uEy80BA')
         await state.clear()
     except Exception as e:
@@ -597,7 +672,7 @@ async def handle_task_report(message: Message, state: FSMContext):
 
 
 @router.message(StateFilter(CommentTask.Comment))
-async def handle_task_comment(message: Message, state: FSMContext):
+async def handle_task_comment(message: Message, state: FSMContext, settings, asana_client):
     selected_task_name = message.text
     data = await state.get_data()
 
@@ -606,28 +681,21 @@ async def handle_task_comment(message: Message, state: FSMContext):
         await message.answer("Дія скасована.", reply_markup=ReplyKeyboardRemove())
         return
 
-    user_tasks_dict = data['user_tasks_dict']
     comment = data['comment']
 
     # Перевіряємо, чи вибрана задача є в списку задач
-    task_found = False
-    chosen_task_gid = 0
-    for task_gid, task_info in user_tasks_dict.items():
-        if task_info['name'] == selected_task_name:
-            task_found = True
-            chosen_task_gid = task_gid
-            break
-
-    if not task_found:
+    chosen_task_gid = selected_task_gid(selected_task_name, data['task_gids'])
+    if chosen_task_gid is None:
         await message.answer("Задача не знайдена. Будь ласка, виберіть задачу зі списку.")
         return
 
-    asana_client = get_asana_client(message.from_user.id)
-    tasks_api_instance = asana.TasksApi(asana_client)
-
-    # Get the existing task details
-    task = tasks_api_instance.get_task(chosen_task_gid, {"opt_fields": "notes"})
-    existing_notes = task['notes'] if 'notes' in task else ""
+    try:
+        # Get the existing task details
+        task = await asana_batch.call(asana_client, 'GET', f'/tasks/{chosen_task_gid}', fields='notes')
+    except AsanaError as e:
+        await message.answer(f"Помилка: {e}", reply_markup=ReplyKeyboardRemove())
+        return
+    existing_notes = task.get('notes') or ""
 
     # Append the new report to the existing notes
     new_notes = f"{existing_notes}\n\n\n\n@{message.from_user.username} додав коментар {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}:\n{comment}"
@@ -639,99 +707,22 @@ async def handle_task_comment(message: Message, state: FSMContext):
     }
 
     try:
-        tasks_api_instance.update_task(body, chosen_task_gid, {})
+        await asana_batch.call(asana_client, 'PUT', f'/tasks/{chosen_task_gid}', body["data"], fields='gid')
         await message.answer("Коментар додано", reply_markup=ReplyKeyboardRemove())
-        settings = get_default_settings(message.chat.id)
-        if settings.toggle_stickers:
+        if settings and settings.toggle_stickers:
             await message.answer_sticker('CAACAgIAAxkBAAELD7ZljiPT4kdgBgABT8XJDtHCqm9YynEAAtoIAAJcAmUD7sMu8F-uEy80BA')
         await state.clear()
     except Exception as e:
         await message.answer(f"Помилка: {e}", reply_markup=ReplyKeyboardRemove())
 
 
-async def daily_notification():
-    chats_to_notify = get_default_settings_for_notification()
-    today = datetime.date.today()
-
-    for chat in chats_to_notify:
-        project_id = chat.project_id
-        notification_user_id = chat.notification_user_id
-        all_users = session.query(Users).all()
-        all_user_ids = set([user.tg_id for user in all_users])
-
-        asana_client = get_asana_client(notification_user_id)
-        tasks_api_instance = asana.TasksApi(asana_client)
-
-        user = get_user(notification_user_id)
-        users_api_instance = asana.UsersApi(asana_client)
-        opts = {
-
-        }
-        try:
-            users_api_instance.get_user("me", opts)
-        except ApiException:
-            new_access_token, new_refresh_token = refresh_access_token(user.asana_refresh_token)
-            create_user(user.tg_id, user.tg_first_name,
-                        user.tg_username, new_access_token,
-                        new_refresh_token, user.asana_id)
-
-        try:
-            opts = {
-                'completed_since': "now",
-                'opt_fields': "name,assignee,due_on"
-            }
-            tasks = tasks_api_instance.get_tasks_for_project(project_id, opts)
-            user_tasks = {}
-            for task in tasks:
-                task_detail = tasks_api_instance.get_task(task['gid'], opts)
-                if 'due_on' in task_detail and task_detail['due_on']:
-                    due_date = datetime.datetime.strptime(task_detail['due_on'], '%Y-%m-%d').date()
-                    if due_date == today and 'assignee' in task_detail and task_detail['assignee']:
-                        assignee_gid = task_detail['assignee']['gid']
-                        telegram_id = session.query(Users).filter(Users.asana_id == assignee_gid).first().tg_id
-                        if telegram_id:
-                            if telegram_id not in user_tasks:
-                                user_tasks[telegram_id] = []
-                            user_tasks[telegram_id].append(task_detail['name'])
-
-            # Відправка повідомлень користувачам з задачами
-            for telegram_id, tasks in user_tasks.items():
-                message = "У вас є завдання на сьогодні:\n" + "\n".join([f"🔸 {task}" for task in tasks])
-                await bot.send_message(telegram_id, message)
-                # Видаляємо ID зі списку
-                all_user_ids.discard(telegram_id)
-
-            # Відправка повідомлень користувачам без задач
-            for user_id in all_user_ids:
-                await bot.send_message(user_id, "На сьогодні задач немає.")
-
-        except Exception as e:
-            logging.error(f"Error fetching tasks for project {project_id}: {e}")
-
-
-def get_user_task_list(user_gid, access_token, workspace_id):
-    url = f"https://app.asana.com/api/1.0/users/{user_gid}/user_task_list"
-    headers = {
-        "Authorization": f"Bearer {access_token}"
-    }
-    params = {
-        "workspace": workspace_id
-    }
-    response = requests.get(url, headers=headers, params=params)
-    if response.status_code == 200:
-        return response.json()["data"]
-    else:
-        raise Exception(f"Error fetching user task list: {response.text}")
-
-
 # * should be at the very end
 @router.message(F.chat.type == 'private', F.text)
 @refresh_token
-async def private_message(message: Message, state: FSMContext):
+async def private_message(message: Message, state: FSMContext, user, settings, asana_client):
     text = message.text
     logging.debug(f"Received private message: {text}")
 
-    settings = get_default_settings(message.chat.id)
     parsed_data = parse_message_complete(text)
     command = parsed_data.get("command")
 
@@ -739,23 +730,29 @@ async def private_message(message: Message, state: FSMContext):
         logging.debug(f"Command detected: {command}")
 
         if command == "complete":
-            await process_complete_command(message, state, message.from_user.id, settings.project_id)
+            await process_complete_command(message, state, user, asana_client, settings.workspace_id,
+                                           settings.project_id)
 
         if command == "duetoday":
-            await process_duetoday_command(message, message.from_user.id, settings.project_id)
+            await process_duetoday_command(message, user, asana_client, settings.workspace_id, settings.project_id,
+                                           settings.timezone)
 
         if command == "help":
             await process_help_command(message)
 
         if command == "stickers":
-            await process_stickers_command(message)
+            await process_stickers_command(message, settings)
+
+        if command == "notify":
+            await process_notify_command(message)
 
         if command == "link":
-            await process_link_command(message, state)
+            await process_link_command(message, state, asana_client)
 
         if command == "comment":
             comment = message.text.split(maxsplit=1)[1]
-            await process_comment_command(message, state, message.from_user.id, settings.project_id, comment)
+            await process_comment_command(message, state, user, asana_client, settings.workspace_id,
+                                          settings.project_id, comment)
 
         return
 
@@ -766,25 +763,26 @@ async def private_message(message: Message, state: FSMContext):
     task_name = parsed_data["task_name"]
     description = parsed_data["description"]
     date = parsed_data["date"]
-    assignees = parsed_data["assignees"]
+    assignees = list(dict.fromkeys(parsed_data["assignees"]))
 
-    asana_client = get_asana_client(message.from_user.id)
     if asana_client is None:
         await message.answer("Спочатку ви маєте зареєструватися.")
         return
 
     due_date = date
 
-    # Use the first assignee or assign the task to the user themselves if no assignee is provided
-    assignee_asana_id = get_asana_id_by_username(assignees[0]) if assignees else get_asana_id_by_tg_id(
-        message.from_user.id)
+    # One task per assignee, or a task for the user themselves if no assignee is provided
+    assignee_ids = await resolve_assignees(user, assignees)
+    unknown_text = unknown_assignees_text(assignees, assignee_ids)
+    if unknown_text:
+        await message.answer(unknown_text)
+        return
 
     # Task creation body for personal tasks
     body = {
         "data": {
             "name": task_name,
             "notes": description,
-            "assignee": assignee_asana_id,
             "workspace": settings.workspace_id,
         }
     }
@@ -792,15 +790,11 @@ async def private_message(message: Message, state: FSMContext):
     if due_date:
         body["data"]["due_on"] = due_date.isoformat()
 
-    opts = {}
-
-    try:
-        tasks_api_instance = asana.TasksApi(asana_client)
-        response = tasks_api_instance.create_task(body, opts)
-        task_permalink = response.get('permalink_url', 'No permalink available')
-        await message.answer(f"Задача створена: [Task Link]({task_permalink})", parse_mode='Markdown')
-    except Exception as e:
-        await message.answer(f"Помилка при створенні задачі: {e}")
+    results = await create_tasks(asana_client, body["data"], assignee_ids)
+    if len(results) == 1 and isinstance(results[0], AsanaError):
+        await message.answer(f"Помилка при створенні задачі: {results[0]}")
+        return
+    await message.answer(created_tasks_text(assignees, results), parse_mode='Markdown')
 
 
 @router.message()
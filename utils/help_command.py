@@ -40,6 +40,15 @@ commands_list_ukrainian = """
    *Використання:* `/asana stickers`
    *Пояснення:* Ця команда вмикає або вимикає використання стікерів ботом.
 
+🔹 **/asana notify** - Увімкнути або вимкнути нагадування без задач.
+   *Використання:* `/asana notify`
+   *Пояснення:* Щодня бот надсилає одне повідомлення з вашими задачами на сьогодні з усіх проектів. Ця команда вмикає або вимикає повідомлення "На сьогодні задач немає." для днів без задач.
+
+🔹 **/asana digest** - Змінити час щоденного нагадування для чату.
+   *Використання:* `/asana digest ГГ:ХХ [часовий пояс]`
+   *Пояснення:* Задачі з проекту цього чату надходитимуть у нагадуванні у вказаний час. За замовчуванням - 09:00 Europe/Kiev.
+   *Приклад:* `/asana digest 08:30 Europe/Warsaw`
+
 📝 **Команди тільки для приватних повідомлень:**
 
 🔹 **stop** - Скасувати авторизацію в Asana та зупинити інтеграцію.
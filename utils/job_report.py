@@ -0,0 +1,93 @@
+import contextlib
+import contextvars
+import datetime
+import json
+import logging
+import time
+
+from db.functions import save_job_run
+
+# Звіт запуску, до якого пишуть лічильники; дочірні asyncio задачі успадковують його разом з контекстом
+current_report = contextvars.ContextVar('current_report', default=None)
+
+# Скільки найповільніших кроків і помилок зберігати в деталях звіту
+details_limit = 20
+
+
+class JobReport:
+    def __init__(self, job_name: str):
+        self.job_name = job_name
+        self.started_at = datetime.datetime.utcnow()
+        self.counters = {
+            'asana_calls': 0,
+            'tasks_scanned': 0,
+            'messages_sent': 0,
+            'messages_failed': 0,
+            'token_refreshes': 0,
+        }
+        self.timings: dict[str, float] = {}
+        self.errors: list[str] = []
+        self.error_count = 0
+        self.duration = 0.0
+        self.status = 'running'
+
+    def to_row(self) -> dict:
+        slowest = sorted(self.timings.items(), key=lambda item: item[1], reverse=True)[:details_limit]
+        return dict(
+            self.counters,
+            job_name=self.job_name,
+            started_at=self.started_at,
+            duration=round(self.duration, 3),
+            status=self.status,
+            error_count=self.error_count,
+            details=json.dumps({'slowest': [[key, round(seconds, 3)] for key, seconds in slowest],
+                                'errors': self.errors[:details_limit]}, ensure_ascii=False),
+        )
+
+
+def count(counter: str, amount: int = 1):
+    report = current_report.get()
+    if report is not None:
+        report.counters[counter] += amount
+
+
+def error(message: str):
+    logging.error(message)
+    report = current_report.get()
+    if report is not None:
+        report.error_count += 1
+        report.errors.append(message)
+
+
+@contextlib.contextmanager
+def timed(key: str):
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        report = current_report.get()
+        if report is not None:
+            report.timings[key] = report.timings.get(key, 0.0) + time.monotonic() - started
+
+
+# Запуск запланованої задачі зі звітом: лічильники збираються по ходу, в кінці звіт пишеться в JobRuns
+@contextlib.asynccontextmanager
+async def job_run(job_name: str):
+    report = JobReport(job_name)
+    token = current_report.set(report)
+    started = time.monotonic()
+    try:
+        yield report
+        report.status = 'ok' if not report.error_count else 'partial'
+    except Exception as e:
+        report.status = 'failed'
+        error(f"{job_name} failed: {e}")
+        raise
+    finally:
+        report.duration = time.monotonic() - started
+        current_report.reset(token)
+        logging.info(f"Job {job_name} finished in {report.duration:.1f}s: {report.status}, {report.counters}")
+        try:
+            await save_job_run(report.to_row())
+        except Exception as e:
+            logging.error(f"Failed to save report of {job_name}: {e}")
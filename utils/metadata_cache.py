@@ -0,0 +1,90 @@
+import asyncio
+import logging
+
+from utils.asana_client import AsanaClient
+from utils.config import metadata_cache_ttl, metadata_cache_size
+from utils.ttl_cache import TTLCache
+
+
+# Кеш робочих просторів, проектів і секцій (gid -> name) для майстра /link.
+# Ключ - (tg_id, тип, батьківський gid). У кеші лежать asyncio.Task, тож одночасні запити
+# одного й того ж списку (префетч і крок майстра) чекають на одне завантаження.
+class AsanaMetadataCache:
+    def __init__(self, ttl: float = metadata_cache_ttl, maxsize: int = metadata_cache_size):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._background = set()
+
+    async def workspaces(self, tg_id: int, asana_client: AsanaClient) -> dict[str, str]:
+        return await self._load((tg_id, 'workspaces', None), asana_client, '/workspaces', {})
+
+    async def projects(self, tg_id: int, asana_client: AsanaClient, workspace_id: str) -> dict[str, str]:
+        return await self._load((tg_id, 'projects', workspace_id), asana_client, '/projects',
+                                {'workspace': workspace_id})
+
+    async def sections(self, tg_id: int, asana_client: AsanaClient, project_id: str) -> dict[str, str]:
+        return await self._load((tg_id, 'sections', project_id), asana_client,
+                                f'/projects/{project_id}/sections', {})
+
+    async def workspace_gid(self, tg_id: int, asana_client: AsanaClient, name: str) -> str | None:
+        return await self._find((tg_id, 'workspaces', None), name, lambda: self.workspaces(tg_id, asana_client))
+
+    async def project_gid(self, tg_id: int, asana_client: AsanaClient, workspace_id: str, name: str) -> str | None:
+        return await self._find((tg_id, 'projects', workspace_id), name,
+                                lambda: self.projects(tg_id, asana_client, workspace_id))
+
+    async def section_gid(self, tg_id: int, asana_client: AsanaClient, project_id: str, name: str) -> str | None:
+        return await self._find((tg_id, 'sections', project_id), name,
+                                lambda: self.sections(tg_id, asana_client, project_id))
+
+    def invalidate(self, tg_id: int, kind: str | None = None, parent_gid: str | None = None):
+        for key in self._cache.keys():
+            if key[0] == tg_id and kind in (None, key[1]) and parent_gid in (None, key[2]):
+                self._cache.invalidate(key)
+
+    def prefetch(self, tg_id: int, asana_client: AsanaClient):
+        # Після авторизації завантажуємо простори і проекти у фоні, щоб /link відповідав з пам'яті
+        task = asyncio.ensure_future(self._prefetch(tg_id, asana_client))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    async def _prefetch(self, tg_id: int, asana_client: AsanaClient):
+        try:
+            workspaces = await self.workspaces(tg_id, asana_client)
+            await asyncio.gather(*[self.projects(tg_id, asana_client, workspace_id) for workspace_id in workspaces])
+        except Exception as e:
+            logging.debug(f"Metadata prefetch for user {tg_id} failed: {e}")
+
+    async def _load(self, key, asana_client: AsanaClient, path: str, params: dict) -> dict[str, str]:
+        task = self._cache.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(asana_client, path, params))
+            self._cache.set(key, task)
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            # Помилки не кешуються
+            if self._cache.get(key) is task:
+                self._cache.invalidate(key)
+            raise
+
+    async def _find(self, key, name: str, load) -> str | None:
+        items = await load()
+        gid = _gid_by_name(items, name)
+        if gid is None:
+            # Назви немає в кеші - можливо, список застарів; перечитуємо один раз
+            self._cache.invalidate(key)
+            gid = _gid_by_name(await load(), name)
+        return gid
+
+    @staticmethod
+    async def _fetch(asana_client: AsanaClient, path: str, params: dict) -> dict[str, str]:
+        params = dict(params, opt_fields='name')
+        return {item['gid']: item['name'] async for item in asana_client.iterate(path, params)}
+
+
+def _gid_by_name(items: dict[str, str], name: str) -> str | None:
+    return next((gid for gid, item_name in items.items() if item_name == name), None)
+
+
+metadata_cache = AsanaMetadataCache()
@@ -0,0 +1,121 @@
+import asyncio
+import datetime
+import logging
+
+import pytz
+
+from aiogram.exceptions import TelegramAPIError
+
+from bot.bot_instance import bot
+from bot.send_queue import send_priority, BULK
+from db.functions import get_default_settings_for_notification
+from db.user_index import user_index
+from utils.asana_functions import get_asana_client
+from utils.due_today import cached_due_tasks
+from utils.config import notification_concurrency, default_digest_time, default_timezone, digest_spread
+from utils.job_report import job_run, count, error, timed
+from utils.task_snapshot import task_snapshots
+
+
+# Щоденне нагадування про задачі на сьогодні для чатів одного слоту (час, часовий пояс):
+# одне повідомлення на користувача з задачами з усіх проектів слоту, згрупованими за проектом.
+# Кожен проект завантажується один раз, навіть якщо до нього прив'язано кілька чатів.
+# Завантаження проектів розподілені рівномірно на digest_spread секунд, одночасно не більше notification_concurrency.
+async def daily_notification(digest_time: str = default_digest_time, timezone: str = default_timezone):
+    async with job_run(f"daily_notification {digest_time} {timezone}"):
+        await notify_slot(digest_time, timezone)
+
+
+async def notify_slot(digest_time: str, timezone: str):
+    # Розсилка йде в черзі після інтерактивних відповідей
+    send_priority.set(BULK)
+    chats_to_notify = await get_default_settings_for_notification(digest_time, timezone)
+    # Один запит за всіма користувачами на весь запуск, далі лише пошук у словнику
+    await user_index.load()
+    today = datetime.datetime.now(pytz.timezone(timezone)).date().isoformat()
+
+    projects = {}
+    for chat in chats_to_notify:
+        projects.setdefault(chat.project_id, []).append(chat)
+
+    semaphore = asyncio.Semaphore(notification_concurrency)
+
+    async def load(index, project_id, chats):
+        await asyncio.sleep(digest_spread * index / len(projects))
+        async with semaphore:
+            with timed(f"project {project_id}, chats {[chat.chat_id for chat in chats]}"):
+                return await project_due_tasks(project_id, chats, today)
+
+    results = await asyncio.gather(*[load(index, project_id, chats)
+                                     for index, (project_id, chats) in enumerate(projects.items())])
+    digests = build_digests(zip(projects.values(), results))
+
+    messages = [send(telegram_id, digest_text(digest)) for telegram_id, digest in digests.items()]
+    # "Задач немає" - лише тим, хто це ввімкнув командою notify, і лише у слоті за замовчуванням
+    if (digest_time, timezone) == (default_digest_time, default_timezone):
+        for user_id in user_index.notify_empty_ids() - digests.keys():
+            messages.append(send(user_id, "На сьогодні задач немає."))
+
+    # Темп відправки задає черга повідомлень
+    await asyncio.gather(*messages)
+
+
+async def project_due_tasks(project_id: str, chats: list, today: str) -> list[dict]:
+    tasks = await cached_due_tasks(project_id, today)
+    if tasks is not None:
+        count('tasks_scanned', len(tasks))
+        return tasks
+
+    # Розрахунку немає або він застарів - проект читається токеном першого чату, якому це вдалося
+    for chat in chats:
+        try:
+            asana_client = await get_asana_client(chat.notification_user_id)
+            if asana_client is not None:
+                return await due_tasks(project_id, asana_client, today)
+        except Exception as e:
+            error(f"Error fetching tasks for project {project_id} with chat {chat.chat_id}: {e}")
+    return []
+
+
+# telegram_id -> {назва проекту: {gid задачі: назва}}
+def build_digests(projects) -> dict[int, dict[str, dict[str, str]]]:
+    digests = {}
+    for chats, tasks in projects:
+        project_name = chats[0].project_name or chats[0].project_id
+        for task in tasks:
+            # Виконавця без акаунта в боті просто пропускаємо
+            telegram_id = user_index.tg_id(task['assignee_gid'])
+            if telegram_id is None:
+                continue
+            digest = digests.setdefault(telegram_id, {})
+            # Задача з кількох проектів показується один раз
+            if any(task['gid'] in project_tasks for project_tasks in digest.values()):
+                continue
+            digest.setdefault(project_name, {})[task['gid']] = task['name']
+    return digests
+
+
+def digest_text(digest: dict[str, dict[str, str]]) -> str:
+    sections = []
+    for project_name, tasks in digest.items():
+        sections.append(f"📁 {project_name}\n" + "\n".join([f"🔸 {task}" for task in tasks.values()]))
+    return "У вас є завдання на сьогодні:\n\n" + "\n\n".join(sections)
+
+
+async def send(chat_id: int, text: str):
+    # Користувач, який заблокував бота, не зупиняє розсилку решті
+    try:
+        await bot.send_message(chat_id, text)
+        count('messages_sent')
+    except TelegramAPIError as e:
+        count('messages_failed')
+        logging.warning(f"Failed to send notification to {chat_id}: {e}")
+
+
+# Незавершені задачі проекту з виконавцем і датою на сьогодні.
+# Список задач уже містить name, assignee і due_on, тож окремий запит на кожну задачу не потрібен.
+async def due_tasks(project_id: str, asana_client, today: str) -> list[dict]:
+    snapshot = await task_snapshots.get(project_id, asana_client)
+    count('tasks_scanned', len(snapshot.tasks))
+    return [dict(task, gid=gid) for gid, task in snapshot.tasks.items()
+            if task['due_on'] == today and task['assignee_gid']]
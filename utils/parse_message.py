@@ -130,9 +130,11 @@ def parse_message(text):
 
 
 def parse_command(text):
-    command_pattern = r"^(complete|duetoday|link|stickers|comment|help)"
+    # Команда з аргументами - окреме перше слово ("digestion report" - назва задачі),
+    # команда без аргументів - весь текст ("notify customers about ..." - теж назва задачі)
+    command_pattern = r"^(?:(complete|duetoday|digest|comment)(?:\s|$)|(link|stickers|notify|help)$)"
     command_match = re.match(command_pattern, text.strip())
-    return command_match.group(1) if command_match else None
+    return command_match.group(1) or command_match.group(2) if command_match else None
 
 
 def parse_message_complete(text: str):
@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import random
+import time
+
+from utils.config import asana_rate_limit_per_minute, asana_rate_burst, asana_max_concurrent_reads, \
+    asana_max_concurrent_writes, asana_max_retries
+from utils.ttl_cache import TTLCache
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    # cost - скільки запитів забирає виклик (batch з кількох дій Asana рахує за кожну дію)
+    async def acquire(self, cost: float = 1):
+        while True:
+            wait = self.ready_in(cost)
+            if wait <= 0:
+                self.tokens -= cost
+                return
+            await asyncio.sleep(wait)
+
+    def try_acquire(self) -> bool:
+        if self.ready_in() > 0:
+            return False
+        self.tokens -= 1
+        return True
+
+    def ready_in(self, cost: float = 1) -> float:
+        # Скільки секунд лишилось до появи cost вільних токенів (0 - можна відправляти зараз).
+        # Дорожчий за місткість bucket виклик чекає повного bucket, а решту боргу відпрацьовують наступні запити
+        now = self._refill()
+        wait = self.blocked_until - now
+        if wait > 0:
+            return wait
+        needed = min(cost, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def pause(self, seconds: float):
+        # Asana повернула 429: до кінця Retry-After запити з цим токеном не відправляються
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def _refill(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return now
+
+
+class _TokenState:
+    def __init__(self, limiter: 'AsanaRateLimiter'):
+        self.bucket = TokenBucket(limiter.rate_per_minute / 60, limiter.burst)
+        self.reads = asyncio.Semaphore(limiter.max_concurrent_reads)
+        self.writes = asyncio.Semaphore(limiter.max_concurrent_writes)
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failures = 0
+
+
+# Планувальник запитів до Asana з обмеженнями на токен: token bucket за кількістю запитів на хвилину
+# і окремі ліміти одночасних читань/записів. 429 чекає Retry-After, 5xx і таймаути повторюються
+# з експоненційною затримкою та jitter (POST не повторюється, щоб не створити задачу двічі).
+class AsanaRateLimiter:
+    def __init__(self, rate_per_minute: float = asana_rate_limit_per_minute, burst: float = asana_rate_burst,
+                 max_concurrent_reads: int = asana_max_concurrent_reads,
+                 max_concurrent_writes: int = asana_max_concurrent_writes, max_retries: int = asana_max_retries,
+                 backoff_base: float = 0.5, backoff_max: float = 30):
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.max_concurrent_reads = max_concurrent_reads
+        self.max_concurrent_writes = max_concurrent_writes
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._tokens = TTLCache(maxsize=4096, ttl=60 * 60)
+
+    async def run(self, access_token: str, method: str, send, cost: int = 1):
+        state = self._state(access_token)
+        attempt = 0
+        while True:
+            await state.bucket.acquire(cost)
+            slots = state.reads if method == 'GET' else state.writes
+            async with slots:
+                state.in_flight += 1
+                state.requests += 1
+                try:
+                    return await send()
+                except Exception as e:
+                    error = e
+                finally:
+                    state.in_flight -= 1
+
+            delay = self._retry_delay(state, error, method, attempt)
+            if delay is None:
+                state.failures += 1
+                raise error
+            attempt += 1
+            state.retries += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict[str, dict]:
+        stats = {}
+        for key, state in self._tokens.items():
+            available = state.bucket.available()
+            stats[key] = {
+                'available': round(available, 1),
+                'capacity': state.bucket.capacity,
+                'usage': round(1 - available / state.bucket.capacity, 2),
+                'in_flight': state.in_flight,
+                'requests': state.requests,
+                'throttled': state.throttled,
+                'retries': state.retries,
+                'failures': state.failures,
+                'blocked_for': round(max(0.0, state.bucket.blocked_until - time.monotonic()), 1),
+            }
+        return stats
+
+    def evict_idle(self) -> int:
+        return self._tokens.expire()
+
+    def _state(self, access_token: str) -> _TokenState:
+        key = _token_key(access_token)
+        state = self._tokens.get(key)
+        if state is None:
+            state = _TokenState(self)
+            self._tokens.set(key, state)
+        return state
+
+    def _retry_delay(self, state: _TokenState, error: Exception, method: str, attempt: int) -> float | None:
+        status = getattr(error, 'status', 0)
+        if attempt >= self.max_retries or status == 0:
+            return None
+        if status == 429:
+            state.throttled += 1
+            state.bucket.pause(_retry_after(error))
+            # Саму паузу витримає bucket.acquire
+            return 0
+        retryable = status is None or 500 <= status < 600
+        if retryable and method != 'POST':
+            return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return None
+
+
+def _retry_after(error) -> float:
+    try:
+        return float(error.headers.get('Retry-After', 1))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def _token_key(access_token: str) -> str:
+    # Самі токени в статистиці не світимо
+    return hashlib.sha256(access_token.encode()).hexdigest()[:12]
+
+
+rate_limiter = AsanaRateLimiter()
@@ -0,0 +1,100 @@
+import logging
+
+from utils.asana_client import AsanaClient, AsanaError
+from utils.task_snapshot import task_snapshots
+from utils.ttl_cache import TTLCache
+
+task_fields = 'name,assignee,due_on,projects,created_at'
+search_page_size = 100
+
+# Пошук задач доступний лише у платних робочих просторах; відмову пам'ятаємо, щоб не питати щоразу
+_search_unavailable = TTLCache(maxsize=1024, ttl=24 * 60 * 60)
+_user_task_lists = TTLCache(maxsize=4096, ttl=24 * 60 * 60)
+
+
+# Незавершені задачі виконавця, за потреби - лише в одному проекті та з конкретною датою.
+# Порядок джерел: теплий знімок проекту, пошук по робочому простору, "Мої задачі" виконавця,
+# і лише потім повне сканування проекту.
+async def find_user_tasks(asana_client: AsanaClient, workspace_id: str, assignee_gid: str,
+                          project_id: str | None = None, due_on: str | None = None) -> dict[str, dict]:
+    if project_id and task_snapshots.is_warm(project_id):
+        snapshot = await task_snapshots.get(project_id, asana_client)
+        return _to_dict(snapshot.tasks_for(assignee_gid, due_on).items())
+
+    if workspace_id and workspace_id not in _search_unavailable:
+        try:
+            tasks = await search_tasks(asana_client, workspace_id, assignee_gid, project_id, due_on)
+            return _to_dict((task['gid'], task) for task in tasks)
+        except AsanaError as e:
+            if e.status not in (402, 403):
+                raise
+            logging.debug(f"Task search is unavailable in workspace {workspace_id}: {e}")
+            _search_unavailable.set(workspace_id, True)
+
+    if workspace_id:
+        try:
+            tasks = await get_user_task_list_tasks(asana_client, assignee_gid, workspace_id)
+            return _to_dict((task['gid'], task) for task in tasks if _matches(task, project_id, due_on))
+        except AsanaError as e:
+            # Список "Мої задачі" доступний лише власнику токена
+            if e.status not in (403, 404) or not project_id:
+                raise
+
+    if not project_id:
+        return {}
+    snapshot = await task_snapshots.get(project_id, asana_client)
+    return _to_dict(snapshot.tasks_for(assignee_gid, due_on).items())
+
+
+async def search_tasks(asana_client: AsanaClient, workspace_id: str, assignee_gid: str,
+                       project_id: str | None = None, due_on: str | None = None) -> list[dict]:
+    params = {
+        'assignee.any': assignee_gid,
+        'projects.any': project_id,
+        'due_on': due_on,
+        'completed': False,
+        'sort_by': 'created_at',
+        'limit': search_page_size,
+        'opt_fields': task_fields,
+    }
+    tasks = []
+    # Пошук не підтримує offset, тож сторінки гортаються за датою створення
+    while True:
+        page = await asana_client.get(f'/workspaces/{workspace_id}/tasks/search', params)
+        tasks.extend(page)
+        if len(page) < search_page_size:
+            return tasks
+        params['created_at.before'] = page[-1]['created_at']
+
+
+async def get_user_task_list(asana_client: AsanaClient, user_gid: str, workspace_id: str) -> dict:
+    return await asana_client.get(f'/users/{user_gid}/user_task_list', {'workspace': workspace_id})
+
+
+async def get_user_task_list_tasks(asana_client: AsanaClient, user_gid: str, workspace_id: str) -> list[dict]:
+    key = (user_gid, workspace_id)
+    user_task_list_gid = _user_task_lists.get(key)
+    if user_task_list_gid is None:
+        user_task_list_gid = (await get_user_task_list(asana_client, user_gid, workspace_id))['gid']
+        _user_task_lists.set(key, user_task_list_gid)
+    return await asana_client.collect(f'/user_task_lists/{user_task_list_gid}/tasks',
+                                      {'completed_since': 'now', 'opt_fields': task_fields})
+
+
+def _matches(task: dict, project_id: str | None, due_on: str | None) -> bool:
+    if due_on is not None and task.get('due_on') != due_on:
+        return False
+    if project_id is not None and not any(project['gid'] == project_id for project in task.get('projects') or []):
+        return False
+    return True
+
+
+def _to_dict(tasks) -> dict[str, dict]:
+    user_tasks_dict = {}
+    for task_gid, task in tasks:
+        assignee = task.get('assignee')
+        user_tasks_dict[task_gid] = {
+            'name': task['name'],
+            'assignee_gid': assignee['gid'] if isinstance(assignee, dict) else task.get('assignee_gid'),
+        }
+    return user_tasks_dict
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+
+from utils.asana_client import AsanaClient, AsanaError
+from utils.config import task_snapshot_sync_interval, task_snapshot_ttl, task_snapshot_size
+from utils.ttl_cache import TTLCache
+
+task_fields = 'name,assignee,due_on,completed,projects'
+
+
+# Локальний знімок незавершених задач проекту з індексом за виконавцем.
+class ProjectTaskSnapshot:
+    def __init__(self, project_gid: str):
+        self.project_gid = project_gid
+        self.sync_token: str | None = None
+        self.synced_at = 0.0
+        self.tasks: dict[str, dict] = {}
+        self.by_assignee: dict[str, set[str]] = {}
+        self.lock = asyncio.Lock()
+
+    def tasks_for(self, assignee_gid: str, due_on: str | None = None) -> dict[str, dict]:
+        tasks = {}
+        for gid in self.by_assignee.get(assignee_gid, ()):
+            task = self.tasks[gid]
+            if due_on is None or task['due_on'] == due_on:
+                tasks[gid] = task
+        return tasks
+
+    def put(self, task: dict):
+        # Завершені задачі та задачі, які прибрали з проекту, в знімок не потрапляють
+        if task.get('completed') or not _in_project(task, self.project_gid):
+            self.drop(task['gid'])
+            return
+        self.drop(task['gid'])
+        assignee_gid = task['assignee']['gid'] if task.get('assignee') else None
+        self.tasks[task['gid']] = {
+            'name': task['name'],
+            'assignee_gid': assignee_gid,
+            'due_on': task.get('due_on'),
+        }
+        if assignee_gid:
+            self.by_assignee.setdefault(assignee_gid, set()).add(task['gid'])
+
+    def drop(self, gid: str):
+        task = self.tasks.pop(gid, None)
+        if task and task['assignee_gid']:
+            gids = self.by_assignee[task['assignee_gid']]
+            gids.discard(gid)
+            if not gids:
+                del self.by_assignee[task['assignee_gid']]
+
+
+# Сховище знімків. Перше звернення до проекту завантажує всі незавершені задачі,
+# далі знімок оновлюється інкрементально через /events з sync токеном.
+class TaskSnapshotStore:
+    def __init__(self, sync_interval: float = task_snapshot_sync_interval, ttl: float = task_snapshot_ttl,
+                 maxsize: int = task_snapshot_size, max_refetch: int = 100):
+        self.sync_interval = sync_interval
+        self.max_refetch = max_refetch
+        self._snapshots = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, project_gid: str, asana_client: AsanaClient) -> ProjectTaskSnapshot:
+        snapshot = self._snapshots.get(project_gid)
+        if snapshot is None:
+            snapshot = ProjectTaskSnapshot(project_gid)
+            self._snapshots.set(project_gid, snapshot)
+        if time.monotonic() - snapshot.synced_at >= self.sync_interval:
+            await self.sync(snapshot, asana_client)
+        return snapshot
+
+    async def sync(self, snapshot: ProjectTaskSnapshot, asana_client: AsanaClient):
+        async with snapshot.lock:
+            # Поки чекали на lock, знімок міг оновити інший запит
+            if time.monotonic() - snapshot.synced_at < self.sync_interval:
+                return
+            if snapshot.sync_token is None or not await self._apply_events(snapshot, asana_client):
+                await self._bootstrap(snapshot, asana_client)
+            snapshot.synced_at = time.monotonic()
+
+    def is_warm(self, project_gid: str) -> bool:
+        snapshot = self._snapshots.get(project_gid)
+        return snapshot is not None and snapshot.sync_token is not None
+
+    def invalidate(self, project_gid: str):
+        self._snapshots.invalidate(project_gid)
+
+    def mark_stale(self, project_gid: str):
+        # Бот сам змінив проект - наступне читання має підтягнути події, не чекаючи sync_interval
+        snapshot = self._snapshots.get(project_gid)
+        if snapshot is not None:
+            snapshot.synced_at = 0.0
+
+    def discard_task(self, gid: str):
+        for snapshot in self._snapshots.values():
+            snapshot.drop(gid)
+
+    async def _bootstrap(self, snapshot: ProjectTaskSnapshot, asana_client: AsanaClient):
+        # Sync токен береться до повного завантаження, щоб не пропустити зміни, які відбудуться під час нього.
+        # Задачі вантажаться в окремий знімок і підміняються лише після останньої сторінки:
+        # якщо завантаження обірветься, знімок лишається холодним і наступний sync почне його заново
+        sync_token = await self._new_sync_token(snapshot.project_gid, asana_client)
+        loaded = ProjectTaskSnapshot(snapshot.project_gid)
+        opts = {'completed_since': 'now', 'opt_fields': task_fields}
+        async for task in asana_client.iterate(f'/projects/{snapshot.project_gid}/tasks', opts):
+            loaded.put(task)
+        snapshot.tasks, snapshot.by_assignee = loaded.tasks, loaded.by_assignee
+        snapshot.sync_token = sync_token
+        logging.debug(f"Task snapshot for project {snapshot.project_gid} bootstrapped: {len(snapshot.tasks)} tasks")
+
+    async def _apply_events(self, snapshot: ProjectTaskSnapshot, asana_client: AsanaClient) -> bool:
+        changed = set()
+        deleted = set()
+        sync_token = snapshot.sync_token
+        while True:
+            try:
+                body = await asana_client.request('GET', '/events',
+                                                  params={'resource': snapshot.project_gid, 'sync': sync_token})
+            except AsanaError as e:
+                if e.status == 412:
+                    # Токен застарів - потрібне повне перезавантаження
+                    return False
+                raise
+            for event in body.get('data') or []:
+                resource = event.get('resource') or {}
+                if resource.get('resource_type') != 'task':
+                    continue
+                if event.get('action') == 'deleted':
+                    deleted.add(resource['gid'])
+                else:
+                    changed.add(resource['gid'])
+            sync_token = body.get('sync', sync_token)
+            if not body.get('has_more'):
+                break
+
+        changed -= deleted
+        if len(changed) > self.max_refetch:
+            return False
+
+        for gid in deleted:
+            snapshot.drop(gid)
+        tasks = await asyncio.gather(*[self._fetch_task(gid, asana_client) for gid in changed])
+        for gid, task in zip(changed, tasks):
+            if task is None:
+                snapshot.drop(gid)
+            else:
+                snapshot.put(task)
+        snapshot.sync_token = sync_token
+        return True
+
+    @staticmethod
+    async def _fetch_task(gid: str, asana_client: AsanaClient) -> dict | None:
+        try:
+            return await asana_client.get(f'/tasks/{gid}', {'opt_fields': task_fields})
+        except AsanaError as e:
+            if e.status in (403, 404):
+                return None
+            raise
+
+    @staticmethod
+    async def _new_sync_token(project_gid: str, asana_client: AsanaClient) -> str | None:
+        try:
+            body = await asana_client.request('GET', '/events', params={'resource': project_gid})
+        except AsanaError as e:
+            if e.status == 412 and isinstance(e.body, dict):
+                return e.body.get('sync')
+            raise
+        return body.get('sync')
+
+
+def _in_project(task: dict, project_gid: str) -> bool:
+    projects = task.get('projects')
+    # Якщо поле не запитували, вважаємо, що задача належить проекту, з якого її отримали
+    return projects is None or any(project['gid'] == project_gid for project in projects)
+
+
+task_snapshots = TaskSnapshotStore()
@@ -1,4 +1,5 @@
 import base64
+import functools
 import logging
 import os
 
@@ -27,26 +28,28 @@ def generate_key():
     return encoded_key
 
 
+# AESGCM для ключа створюється один раз: ключів кілька, а шифрування і розшифрування йдуть на кожен токен
+@functools.lru_cache(maxsize=8)
+def _cipher(key) -> AESGCM:
+    return AESGCM(base64.urlsafe_b64decode(key))
+
+
 # Функція для шифрування
 def encrypt_token(key, token):
-    key = base64.urlsafe_b64decode(key)
     # Генерування нонсу
     nonce = os.urandom(12)
     # Шифрування
-    aesgcm = AESGCM(key)
-    encrypted = aesgcm.encrypt(nonce, token.encode(), None)
+    encrypted = _cipher(key).encrypt(nonce, token.encode(), None)
     return base64.urlsafe_b64encode(nonce + encrypted).decode('utf-8')
 
 
 # Функція для розшифрування
 def decrypt_token(key, encrypted_token):
     try:
-        key = base64.urlsafe_b64decode(key)
         encrypted_token = base64.urlsafe_b64decode(encrypted_token)
         nonce = encrypted_token[:12]
         encrypted = encrypted_token[12:]
-        aesgcm = AESGCM(key)
-        decrypted = aesgcm.decrypt(nonce, encrypted, None)
+        decrypted = _cipher(key).decrypt(nonce, encrypted, None)
         return decrypted.decode('utf-8')
     except Exception as e:
         logging.debug(e)
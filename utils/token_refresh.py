@@ -0,0 +1,26 @@
+import asyncio
+
+
+# Single-flight координатор оновлення токенів.
+# Одночасні виклики для одного користувача чекають на один і той самий запит до Asana,
+# тому refresh token ротується рівно один раз, а нова пара записується один раз.
+class TokenRefreshCoordinator:
+    def __init__(self, refresh_func):
+        self._refresh_func = refresh_func
+        self._in_flight: dict[int, asyncio.Task] = {}
+
+    async def refresh(self, tg_id: int, failed_token: str | None = None) -> str | None:
+        task = self._in_flight.get(tg_id)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh_func(tg_id, failed_token))
+            self._in_flight[tg_id] = task
+            task.add_done_callback(lambda done: self._forget(tg_id, done))
+        # shield: скасування одного з очікувачів не скасовує оновлення для інших
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def _forget(self, tg_id: int, task: asyncio.Task):
+        if self._in_flight.get(tg_id) is task:
+            del self._in_flight[tg_id]
@@ -0,0 +1,66 @@
+import logging
+
+from utils.config import key as handoff_key, token_vault_key, token_vault_cache_ttl, token_vault_cache_size
+from utils.token_encryption import encrypt_token, decrypt_token
+from utils.ttl_cache import TTLCache
+
+
+# Сховище Asana токенів: у базі токени лежать зашифрованими (AES-GCM, префікс SEALED_PREFIX),
+# розшифровані тримаються в обмеженому кеші з TTL за шифротекстом.
+# Кожне шифрування дає новий шифротекст, тож оновлений токен ніколи не читається зі старого запису кешу.
+# Працює прозоро через тип колонки db.models.EncryptedToken: код і далі читає user.asana_token.
+class TokenVault:
+    SEALED_PREFIX = 'v1:'
+
+    def __init__(self, key: str | None = token_vault_key, cache_ttl: float = token_vault_cache_ttl,
+                 cache_size: int = token_vault_cache_size):
+        self.key = key
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.hits = 0
+        self.misses = 0
+
+    # Без власного ключа шифрування в базі нічого не захищає - міграція 8 і бот відмовляються запускатись
+    def require_key(self):
+        if not self.key:
+            raise RuntimeError("TOKEN_VAULT_KEY is not set")
+        if self.key == handoff_key:
+            raise RuntimeError("TOKEN_VAULT_KEY must differ from the token handoff key in utils.config")
+
+    def is_sealed(self, value: str | None) -> bool:
+        return value is not None and value.startswith(self.SEALED_PREFIX)
+
+    def seal(self, token: str | None) -> str | None:
+        if token is None or self.is_sealed(token):
+            return token
+        self.require_key()
+        sealed = self.SEALED_PREFIX + encrypt_token(self.key, token)
+        # Щойно записаний токен зазвичай одразу читається - розшифровувати його не потрібно
+        self._cache.set(sealed, token)
+        return sealed
+
+    # Незашифровані значення (рядки до міграції 8) повертаються як є
+    def open(self, value: str | None) -> str | None:
+        if not self.is_sealed(value):
+            return value
+        token = self._cache.get(value)
+        if token is not None:
+            self.hits += 1
+            return token
+        self.misses += 1
+        self.require_key()
+        token = decrypt_token(self.key, value[len(self.SEALED_PREFIX):])
+        if token is None:
+            # Інший ключ або пошкоджений запис: користувачу доведеться авторизуватись заново
+            logging.warning("Stored Asana token could not be decrypted")
+            return None
+        self._cache.set(value, token)
+        return token
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {'size': len(self._cache), 'hits': self.hits, 'misses': self.misses}
+
+
+token_vault = TokenVault()
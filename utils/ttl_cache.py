@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# LRU-кеш з обмеженим розміром та часом життя записів.
+# on_evict викликається для кожного значення, що покидає кеш (витіснення, TTL, invalidate, clear).
+class TTLCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 300, on_evict=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self._evict(value)
+                return default
+            # Доступ продовжує життя запису і переносить його в кінець LRU черги
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None and old[0] is not value:
+                self._evict(old[0])
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            while len(self._data) > self.maxsize:
+                _, (evicted, _) = self._data.popitem(last=False)
+                self._evict(evicted)
+
+    def invalidate(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is not None:
+                self._evict(item[0])
+            return item is not None
+
+    def expire(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._data.items() if expires_at <= now]
+            for key in expired:
+                value, _ = self._data.pop(key)
+                self._evict(value)
+            return len(expired)
+
+    def clear(self):
+        with self._lock:
+            values = [value for value, _ in self._data.values()]
+            self._data.clear()
+            for value in values:
+                self._evict(value)
+
+    def items(self):
+        # Читання без продовження життя записів і без зміни LRU порядку (статистика, моніторинг)
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (value, expires_at) in self._data.items() if expires_at > now]
+
+    def keys(self):
+        with self._lock:
+            return list(self._data.keys())
+
+    def values(self):
+        with self._lock:
+            return [value for value, _ in self._data.values()]
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._data)
+
+    def _evict(self, value):
+        if self.on_evict is not None:
+            self.on_evict(value)
+
+
+_MISSING = object()